@@ -1,8 +1,13 @@
+import collections
+import functools
+import operator
+import time
 import typing
 import uuid
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Depends
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request, Depends, Response
+from pydantic import BaseModel, TypeAdapter
 from pydantic_settings import BaseSettings
 
 from pangloss_core.model_setup.model_manager import ModelManager
@@ -10,8 +15,6 @@ from pangloss_core.exceptions import PanglossNotFoundError
 from pangloss_core.users import User, get_current_active_user
 from pangloss_core.model_setup.build_model_hierarchy import recursive_get_subclasses
 
-import asyncio
-
 
 class ErrorResponse(BaseModel):
     detail: str
@@ -28,89 +31,192 @@ class ListResponse[T](typing.TypedDict):
     previousUrl: str | None
 
 
+_type_adapters: dict[tuple[type, str], tuple[typing.Any, TypeAdapter]] = {}
+
+
+def _get_type_adapter(model: type, kind: str, annotation: typing.Any) -> TypeAdapter:
+    """Get the (cached) TypeAdapter for a kind of response from a model's routes.
+
+    The annotation is stored alongside, so that an adapter is rebuilt if models
+    are initialised again (generating new Reference classes)"""
+    cached = _type_adapters.get((model, kind))
+    if cached is None or cached[0] != annotation:
+        cached = (annotation, TypeAdapter(annotation))
+        _type_adapters[(model, kind)] = cached
+    return cached[1]
+
+
+def _model_json_response(result: BaseModel) -> Response:
+    """Serialise a pydantic model straight to JSON bytes with its own serializer.
+
+    As a Response is returned from the endpoint, FastAPI does not validate it against
+    the response model (the return annotation), which is then only used for the
+    OpenAPI schema"""
+    return Response(
+        content=result.__pydantic_serializer__.to_json(result, by_alias=True),
+        media_type="application/json",
+    )
+
+
+class _ListCache:
+    """Short-lived LRU cache of list query results, keyed by model and query.
+
+    Cleared when anything is created or edited through the API; changes made
+    otherwise show up once an entry expires. A ttl of 0 disables the cache"""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: collections.OrderedDict[
+            tuple, tuple[float, dict[str, typing.Any]]
+        ] = collections.OrderedDict()
+
+    def get(self, key: tuple) -> dict[str, typing.Any] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: tuple, result: dict[str, typing.Any]) -> None:
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, result)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
 def setup_api_routes(_app: FastAPI, settings: BaseSettings) -> FastAPI:
 
-    api_router = APIRouter(prefix="/api")
+    list_cache = _ListCache(ttl=settings.LIST_CACHE_TTL)  # type: ignore
+
+    # Routes are collected and then added to the app in one pass: building them in
+    # a router per model and including these (via an "/api" router) in the app would
+    # have FastAPI construct each route again for every level of inclusion
+    routes: list[dict[str, typing.Any]] = []
     for model in ModelManager._registered_models:
-        router = APIRouter(prefix=f"/{model.__name__}", tags=[model.__name__])
+        prefix = f"/api/{model.__name__}"
+        tags = [model.__name__]
+
+        # Lists should also show any subclass of the model type,
+        # so we need to allow this by getting all subclasses (once, when
+        # setting up the routes)
+        model_subclasses = recursive_get_subclasses(model)
+        allowed_types = (
+            functools.reduce(operator.or_, (m.Reference for m in model_subclasses))
+            if model_subclasses
+            else model.Reference
+        )
 
-        def _list(model):
+        # Validation and serialisation of the response is done with a prebuilt
+        # adapter; returning a Response directly means FastAPI does not run it all again.
+        # The data comes from the database, so it is validated once here (if only to
+        # convert to the Reference types), but not again against the response model
+        list_adapter = _get_type_adapter(
+            model, "list", ListResponse[allowed_types]  # type: ignore
+        )
 
-            # Lists should also show any subclass of the model type,
-            # so we need to allow this by getting all subclasses
-            model_subclasses = recursive_get_subclasses(model)
-            allowed_types = (
-                typing.Union[*(m.Reference for m in model_subclasses)]  # type: ignore
-                if model_subclasses
-                else model.Reference
-            )
+        # The endpoint factories resolve the model's methods once, here, so that each
+        # request only reads a closure variable. (These cannot be default arguments of
+        # the endpoints themselves, as FastAPI would treat them as query parameters)
+        def _list(model, allowed_types=allowed_types, list_adapter=list_adapter):
+            get_list = model.get_list
 
             async def list(
                 request: Request,
                 # current_user: typing.Annotated[User, Depends(get_current_active_user)], # Don't lock down list view
                 q: typing.Optional[str] = "",
                 page: int = 1,
-                pageSize: int = 50,
+                # At least 1, as the number of pages is worked out by dividing by it
+                pageSize: typing.Annotated[int, Query(ge=1)] = 50,
             ) -> ListResponse[allowed_types]:  # type: ignore
-                # await asyncio.sleep(5)
-                result = await model.get_list(q=q, page=page, page_size=pageSize)
-                result["nextPage"] = (
-                    page + 1 if page + 1 <= result["totalPages"] else None
-                )
-                result["nextUrl"] = (
-                    str(
-                        request.url.replace_query_params(
-                            q=q, page=page + 1, pageSize=pageSize
-                        )
+                # The cached result is shared, so must not be modified here
+                cache_key = (model, q, page, pageSize)
+                result = list_cache.get(cache_key)
+                if result is None:
+                    result = await get_list(q=q, page=page, page_size=pageSize)
+                    list_cache.set(cache_key, result)
+                next_page = page + 1 if page < result["totalPages"] else None
+                previous_page = page - 1 if page > 1 else None
+
+                # Build the page URLs by formatting onto a single base, rather than
+                # having Starlette parse and rebuild the whole URL for each one
+                next_url = previous_url = None
+                if next_page or previous_page:
+                    url_base = (
+                        f"{str(request.url).partition("?")[0]}?{urlencode({"q": q})}"
                     )
-                    if page + 1 <= result["totalPages"]
-                    else None
-                )
-                result["previousPage"] = page - 1 if page - 1 >= 1 else None
-                result["previousUrl"] = (
-                    str(
-                        request.url.replace_query_params(
-                            q=q, page=page - 1, pageSize=pageSize
+                    if next_page:
+                        next_url = f"{url_base}&page={next_page}&pageSize={pageSize}"
+                    if previous_page:
+                        previous_url = (
+                            f"{url_base}&page={previous_page}&pageSize={pageSize}"
                         )
-                    )
-                    if page - 1 >= 1
-                    else None
+
+                envelope = {
+                    "results": result["results"],
+                    "page": page,
+                    "count": result["count"],
+                    "totalPages": result["totalPages"],
+                    "nextPage": next_page,
+                    "previousPage": previous_page,
+                    "nextUrl": next_url,
+                    "previousUrl": previous_url,
+                }
+                return Response(
+                    content=list_adapter.dump_json(
+                        list_adapter.validate_python(envelope), by_alias=True
+                    ),
+                    media_type="application/json",
                 )
-                # print(result)
-                return result
 
             return list
 
-        router.add_api_route(
-            "/",
-            endpoint=_list(model),
-            methods={"get"},
-            name=f"{model.__name__}list",
-            operation_id=f"{model.__name__}list",
-            openapi_extra={"requiresAuth": True},
+        routes.append(
+            dict(
+                path=f"{prefix}/",
+                endpoint=_list(model),
+                methods={"get"},
+                name=f"{model.__name__}list",
+                operation_id=f"{model.__name__}list",
+                openapi_extra={"requiresAuth": True},
+                tags=tags,
+            )
         )
 
         if not model.__abstract__:
 
             def _get(model):
+                view_get = model.View.get
+
                 async def get(
                     uid: uuid.UUID,
                 ) -> model.View:  # type: ignore
 
                     try:
-                        result = await model.View.get(uid=uid)
+                        result = await view_get(uid=uid)
                     except PanglossNotFoundError:
                         raise HTTPException(status_code=404, detail="Item not found")
-                    return result
+                    return _model_json_response(result)
 
                 return get
 
-            router.api_route(
-                "/{uid}",
+            # Added after the "/edit" routes, so that "/edit" is not taken as a uid
+            view_route = dict(
+                path=f"{prefix}/{{uid}}",
+                endpoint=_get(model),
                 methods=["get"],
                 name=f"{model.__name__}.View",
                 operation_id=f"{model.__name__}View",
-            )(_get(model))
+                tags=tags,
+            )
 
             if model.__create__:
 
@@ -122,38 +228,48 @@ def setup_api_routes(_app: FastAPI, settings: BaseSettings) -> FastAPI:
                         ],
                     ) -> model.Reference:  # type: ignore
                         result = await entity.create(username=current_user.username)
-                        return result
+                        list_cache.clear()
+                        return _model_json_response(result)
 
                     return create
 
-                router.api_route(
-                    "/new",
-                    methods=["post"],
-                    name=f"{model.__name__}.Create",
-                    operation_id=f"{model.__name__}Create",
-                )(_create(model))
+                routes.append(
+                    dict(
+                        path=f"{prefix}/new",
+                        endpoint=_create(model),
+                        methods=["post"],
+                        name=f"{model.__name__}.Create",
+                        operation_id=f"{model.__name__}Create",
+                        tags=tags,
+                    )
+                )
 
             if model.__edit__:
 
                 def _get_edit(model):
+                    edit_get = model.Edit.get
+
                     async def get_edit(uid: uuid.UUID) -> model.Edit:  # type: ignore
 
                         try:
-                            result = await model.Edit.get(uid=uid)
+                            result = await edit_get(uid=uid)
                         except PanglossNotFoundError:
                             raise HTTPException(
                                 status_code=404, detail="Item not found"
                             )
-                        return result
+                        return _model_json_response(result)
 
                     return get_edit
 
-                router.add_api_route(
-                    "/edit",
-                    endpoint=_get_edit(model),
-                    methods={"get"},
-                    name=f"{model.__name__}.EditGet",
-                    operation_id=f"{model.__name__}EditGet",
+                routes.append(
+                    dict(
+                        path=f"{prefix}/edit",
+                        endpoint=_get_edit(model),
+                        methods={"get"},
+                        name=f"{model.__name__}.EditGet",
+                        operation_id=f"{model.__name__}EditGet",
+                        tags=tags,
+                    )
                 )
 
                 def _post_edit(model):
@@ -173,6 +289,7 @@ def setup_api_routes(_app: FastAPI, settings: BaseSettings) -> FastAPI:
                             result = await entity.write_edit(
                                 username=current_user.username
                             )
+                            list_cache.clear()
                         except PanglossNotFoundError:
                             raise HTTPException(
                                 status_code=404, detail="Item not found"
@@ -181,14 +298,19 @@ def setup_api_routes(_app: FastAPI, settings: BaseSettings) -> FastAPI:
 
                     return post_edit
 
-                router.add_api_route(
-                    "/edit/{uid}",
-                    endpoint=_post_edit(model),
-                    methods={"patch"},
-                    name=f"{model.__name__}.EditPatch",
-                    operation_id=f"{model.__name__}EditPatch",
+                routes.append(
+                    dict(
+                        path=f"{prefix}/edit/{{uid}}",
+                        endpoint=_post_edit(model),
+                        methods={"patch"},
+                        name=f"{model.__name__}.EditPatch",
+                        operation_id=f"{model.__name__}EditPatch",
+                        tags=tags,
+                    )
                 )
 
+            routes.append(view_route)
+
             if model.__delete__:
 
                 def _delete(model):
@@ -199,13 +321,16 @@ def setup_api_routes(_app: FastAPI, settings: BaseSettings) -> FastAPI:
 
                     return delete
 
-                router.add_api_route(
-                    "/{uid}",
-                    endpoint=_delete(model),
-                    methods={"delete"},
-                    name=f"{model.__name__}.Delete",
+                routes.append(
+                    dict(
+                        path=f"{prefix}/{{uid}}",
+                        endpoint=_delete(model),
+                        methods={"delete"},
+                        name=f"{model.__name__}.Delete",
+                        tags=tags,
+                    )
                 )
 
-        api_router.include_router(router)
-    _app.include_router(api_router)
+    for route in routes:
+        _app.add_api_route(**route)
     return _app
@@ -1,5 +1,7 @@
 import asyncio
 import contextlib
+import importlib
+import importlib.util
 import logging
 import sys
 
@@ -8,6 +10,7 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 
 
+from pangloss_core.orjson_response import ORJSONResponse
 from pangloss_core.settings import BaseSettings
 from pangloss_core.users import setup_user_routes
 from pangloss_core.database import initialise_database_driver
@@ -15,6 +18,9 @@ from pangloss_core.database import initialise_database_driver
 logger = logging.getLogger("uvicorn.info")
 RunningBackgroundTasks = []
 
+# Seconds to wait at shutdown for cancelled background tasks to finish
+BACKGROUND_TASK_SHUTDOWN_TIMEOUT = 10.0
+
 
 def get_application(settings: BaseSettings):
     DEVELOPMENT_MODE = "--reload" in sys.argv # Dumb hack!
@@ -29,7 +35,7 @@ def get_application(settings: BaseSettings):
         for task in BackgroundTaskRegistry:
             if not DEVELOPMENT_MODE or task["run_in_dev"]:
             
-                running_task = asyncio.create_task(task["function"]()) # type: ignore
+                running_task = asyncio.create_task(task["function"](), name=task["name"]) # type: ignore
              
                 RunningBackgroundTasks.append(running_task)
             else:
@@ -37,22 +43,42 @@ def get_application(settings: BaseSettings):
         yield
         
             
-        for task in BackgroundTaskCloseRegistry:
-            await task()
-            
+        # Close functions are run concurrently, so shutdown is not held up waiting
+        # on each in turn; one failing does not stop the others, or cancellation
+        close_results = await asyncio.gather(
+            *(task() for task in BackgroundTaskCloseRegistry), return_exceptions=True
+        )
+        for result in close_results:
+            if isinstance(result, BaseException):
+                logger.error(f"Error closing background task: {result!r}")
+
         logging.info("Closing background tasks...")
         for task in RunningBackgroundTasks:
-            task.cancel()    
-            
+            task.cancel()
+        # A task that is slow to handle (or ignores) cancellation should not hold up
+        # shutdown indefinitely, so those still running after the timeout are left
+        if RunningBackgroundTasks:
+            done, pending = await asyncio.wait(
+                RunningBackgroundTasks, timeout=BACKGROUND_TASK_SHUTDOWN_TIMEOUT
+            )
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(
+                        f"Error in background task '{task.get_name()}': {task.exception()!r}"
+                    )
+            for task in pending:
+                logger.warning(
+                    f"Background task '{task.get_name()}' did not stop within "
+                    f"{BACKGROUND_TASK_SHUTDOWN_TIMEOUT}s of shutdown"
+                )
+
         logging.info("Background tasks closed")
 
     for installed_app in settings.INSTALLED_APPS:
-        __import__(f"{installed_app}.models")
-        try:
-            __import__(f"{installed_app}.background_tasks")
-        except ModuleNotFoundError:
-            pass
-        __import__(installed_app)
+        importlib.import_module(f"{installed_app}.models")
+        if importlib.util.find_spec(f"{installed_app}.background_tasks"):
+            importlib.import_module(f"{installed_app}.background_tasks")
+        importlib.import_module(installed_app)
 
     ModelManager.initialise_models(depth=3)
     initialise_database_driver(settings)
@@ -60,6 +86,7 @@ def get_application(settings: BaseSettings):
         title=settings.PROJECT_NAME,
         swagger_ui_parameters={"defaultModelExpandDepth": 1, "deepLinking": True},
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
     _app = setup_api_routes(_app, settings)
     _app = setup_user_routes(_app, settings)
@@ -70,7 +97,9 @@ def get_application(settings: BaseSettings):
         allow_methods=["*"],
         allow_headers=["*"],
     )
-    _app.add_middleware(GZipMiddleware, minimum_size=400)
+    # Small responses (e.g. single items) are not worth compressing; and Starlette's
+    # default compresslevel (9) costs a lot more CPU than it saves in size over level 5
+    _app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
     
     
 
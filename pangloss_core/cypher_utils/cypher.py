@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-import inspect
+import contextvars
+import functools
+import itertools
+import operator
 import typing
 import uuid
 from typing import Any
@@ -17,263 +20,507 @@ if typing.TYPE_CHECKING:
     from pangloss_core.model_setup.base_node_definitions import (
         AbstractBaseNode,
     )
+    from pangloss_core.model_setup.config_definitions import (
+        _RelationConfigInstantiated,
+    )
+
+
+_query_identifiers: contextvars.ContextVar[typing.Iterator[int]] = (
+    contextvars.ContextVar("_query_identifiers")
+)
+
 
-from pangloss_core.model_setup.relation_to import ReifiedRelation
+def start_query_identifiers() -> None:
+    """Restart the numbering of identifiers from `get_unique_string`, when building
+    a new query"""
+    _query_identifiers.set(itertools.count())
 
 
 def get_unique_string():
-    return "x" + uuid.uuid4().hex[:6].lower()
+    """Identifier for a variable or parameter, unique within the query being built.
+
+    These are numbered in order (see `start_query_identifiers`) rather than random,
+    so that queries of the same shape have the same text, and Neo4j can reuse the
+    cached plan"""
+    try:
+        identifiers = _query_identifiers.get()
+    except LookupError:
+        identifiers = itertools.count()
+        _query_identifiers.set(identifiers)
+    return f"x{next(identifiers)}"
+
+
+@functools.lru_cache(maxsize=None)
+def _query_labels_for_class(cls: type, extra_labels: tuple[str, ...]) -> str:
+    try:
+        labels = cls._get_model_labels()
+    except:
+        labels = cls.base_class._get_model_labels()
+
+    return ":" + ":".join([*labels, *extra_labels])
 
 
 def labels_to_query_labels(
     node: AbstractBaseNode | type[AbstractBaseNode] | type[EditNodeBase],
-    extra_labels: list[str] | None = None,
+    extra_labels: typing.Sequence[str] = (),
 ) -> str:
-    try:
-        labels = node._get_model_labels()
-    except:
-        labels = node.base_class._get_model_labels()
+    # A model's labels do not change, so are only worked out once for each class
+    # (and set of extra labels)
+    return _query_labels_for_class(
+        node if isinstance(node, type) else type(node),
+        extra_labels if isinstance(extra_labels, tuple) else tuple(extra_labels),
+    )
+
+
+# Extra labels for nodes created along with the node they belong to. These are fixed
+# tuples, so they can be passed straight to labels_to_query_labels
+EMBEDDED_EXTRA_LABELS = ("Embedded", "DeleteDetach")
+
+# Keyed by the relation config's `edit_inline` and `delete_related_on_detach`
+INLINE_EXTRA_LABELS = {
+    (edit_inline, delete_related_on_detach): (
+        "CreateInline",
+        "ReadInline",
+        *(("EditInline",) if edit_inline else ()),
+        *(("DeleteDetach",) if delete_related_on_detach else ()),
+    )
+    for edit_inline in (False, True)
+    for delete_related_on_detach in (False, True)
+}
+
 
-    if extra_labels:
-        labels.extend(extra_labels)
-    return ":" + ":".join(labels)
+# Conversion of values to types that can be written to the database, by type of value
+# (None where the value is written as it is). Other types are added as they are met
+_converters_for_writing: dict[type, typing.Callable[[Any], Any] | None] = {
+    str: None,
+    int: None,
+    float: None,
+    bool: None,
+    type(None): None,
+    uuid.UUID: str,
+    pydantic.AnyUrl: str,
+    set: list,
+}
+
+
+def _converter_for_writing(value_type: type) -> typing.Callable[[Any], Any] | None:
+    if issubclass(value_type, (uuid.UUID, pydantic.AnyUrl)):
+        return str
+    if issubclass(value_type, set):
+        return list
+    return None
 
 
 def convert_type_for_writing(value):
-    match value:
-        case uuid.UUID():
-            return str(value)
-        case pydantic.AnyUrl():
-            return str(value)
-        case set():
-            return list(value)
-        case _:
-            return value
-
-
-def unpack_properties_to_create_props_and_param_dict(
+    value_type = type(value)
+    try:
+        converter = _converters_for_writing[value_type]
+    except KeyError:
+        converter = _converters_for_writing[value_type] = _converter_for_writing(
+            value_type
+        )
+    return value if converter is None else converter(value)
+
+
+_properties_for_writing: dict[
+    type,
+    tuple[dict[str, Any], tuple[str, ...], typing.Callable[[Any], tuple[Any, ...]]],
+] = {}
+
+
+def _get_properties_for_writing(
     node: AbstractBaseNode,
-    username: str,
-    skip_fields: list[str] = [],
-    omit_braces: bool=False
-) -> tuple[str, dict[str, Any]]:
-    q_pairs = []
-    params = {}
+) -> tuple[dict[str, Any], tuple[str, ...], typing.Callable[[Any], tuple[Any, ...]]]:
+    """Get the (cached) names of the properties to write for a type of node, along with
+    a getter for all their values at once.
 
-    for prop_name, field in node.property_fields.items():
-        if prop_name not in skip_fields:
-            try:
-                param_id = get_unique_string()
-                params[param_id] = convert_type_for_writing(getattr(node, prop_name))
-                q_pairs.append(f"""{prop_name}: ${param_id}""")
-            except AttributeError as e:
-                if isinstance(node, EmbeddedNodeBase) and prop_name == "label":
-                    pass
-                else:
-                    print(prop_name)
-                    raise AttributeError(e)
-
-    real_type_id = get_unique_string()
-    
-   
-    if hasattr(node, "real_type"):
-        params[real_type_id] = (
-            node.real_type
+    Embedded types have no label, so it is left out for them. The property fields
+    are stored alongside, so these are worked out again if a model is initialised
+    again"""
+    property_fields = node.property_fields
+    cached = _properties_for_writing.get(type(node))
+    if cached is None or cached[0] is not property_fields:
+        prop_names = tuple(
+            prop_name
+            for prop_name in property_fields
+            if not (isinstance(node, EmbeddedNodeBase) and prop_name == "label")
         )
-    else:
-        params[real_type_id] = node.__class__.__name__
-  
-    params["username"] = username
-        
-    q_pairs.append(f"""real_type: ${real_type_id}""")
-    q_pairs.append("""created_when: datetime()""")
-    q_pairs.append("""modified_when: datetime()""")
-    q_pairs.append("""created_by: $username""")
-    q_pairs.append("""modified_by: $username""")
-    if omit_braces:
-        return ", ".join(q_pairs), params
-    return "{" + ", ".join(q_pairs) + "}", params
-
-
-def unpack_dict_to_cypher_map_and_params(d):
-    q_pairs = []
-    params = {}
-    for key, value in d.items():
-        param_id = get_unique_string()
-        params[param_id] = convert_type_for_writing(value)
-        q_pairs.append(f"""{key}: ${param_id}""")
-    return "{" + ", ".join(q_pairs) + "}", params
+        cached = (property_fields, prop_names, _values_getter(prop_names))
+        _properties_for_writing[type(node)] = cached
+    return cached
 
 
-def build_write_query_and_params_dict_for_single_node(
-    node: AbstractBaseNode, username: str
-) -> tuple[str, str, dict[str, Any]]:
-    labels = labels_to_query_labels(node)
-    (
-        node_props,
-        params_dict,
-    ) = unpack_properties_to_create_props_and_param_dict(node, username=username)
+def _values_getter(names: tuple[str, ...]) -> typing.Callable[[Any], tuple[Any, ...]]:
+    """Getter for a tuple of the values of the named attributes of an object"""
+    # attrgetter returns a single value (rather than a tuple) for one name,
+    # and cannot be made with none
+    if len(names) > 1:
+        return operator.attrgetter(*names)
+    if names:
+        single_getter = operator.attrgetter(names[0])
+        return lambda obj: (single_getter(obj),)
+    return lambda obj: ()
 
-    node_identifier = get_unique_string()
 
-    query = f"""
-    
-    CREATE ({node_identifier}{labels_to_query_labels(node)} {node_props})
-    
-    """
-    return node_identifier, query, params_dict
+def get_property_names_for_writing(node: AbstractBaseNode) -> tuple[str, ...]:
+    """Get the (cached) names of the properties to write for a type of node"""
+    return _get_properties_for_writing(node)[1]
 
 
-def build_write_query_for_related_node(
-    current_node_identifier: str,
-    related_node: AbstractBaseNode,
-    relation_label: str,
-    relation_properties: dict,
-) -> tuple[list[str], list[str], dict[str, Any]]:
-    related_node_identifier = get_unique_string()
-    uid_param = get_unique_string()
+def build_properties_create_dict(node: AbstractBaseNode) -> dict[str, Any]:
+    _, prop_names, getter = _get_properties_for_writing(node)
+    properties = {
+        prop_name: convert_type_for_writing(value)
+        for prop_name, value in zip(prop_names, getter(node))
+    }
 
-    (
-        relation_properties_cypher,
-        relation_properties_params,
-    ) = unpack_dict_to_cypher_map_and_params(relation_properties)
+    if hasattr(node, "real_type"):
+        properties["real_type"] = node.real_type
+    else:
+        properties["real_type"] = node.__class__.__name__
+    return properties
+
+
+type RelationRow[T] = tuple[str, dict[str, Any] | None, int, T, dict[str, Any]]
+
+_relation_config_properties: dict[
+    int, tuple[_RelationConfigInstantiated, dict[str, Any]]
+] = {}
+
+
+def get_relation_config_properties(
+    relation_config: _RelationConfigInstantiated,
+) -> dict[str, Any]:
+    """Get the (cached) properties written to every relation with this config.
+
+    As the cache is keyed by the id of the config, the config itself is stored alongside
+    and checked, in case the id has been reused"""
+    cached = _relation_config_properties.get(id(relation_config))
+    if cached is None or cached[0] is not relation_config:
+        cached = (
+            relation_config,
+            {
+                "reverse_name": relation_config.reverse_name,
+                "relation_labels": list(relation_config.relation_labels),
+            },
+        )
+        _relation_config_properties[id(relation_config)] = cached
+    return cached[1]
 
-    MATCH_CLAUSES = [f"MATCH ({related_node_identifier} {{uid: ${uid_param}}})"]
-    CREATE_CLAUSES = [
-        f"CREATE ({current_node_identifier})-[:{relation_label.upper()} {relation_properties_cypher}]->({related_node_identifier})"
-    ]
 
+def _relation_set_clause(
+    params_dict: dict[str, Any],
+    rows_param: str,
+    config_properties: dict[str, Any] | None,
+) -> str:
+    """SET clause for a group of relations: the properties of its config, as one
+    parameter for the group, followed by the properties of each relation"""
+    if config_properties is None:
+        return "SET new_relation = relation.properties"
+    params_dict[f"{rows_param}_config"] = config_properties
     return (
-        MATCH_CLAUSES,
-        CREATE_CLAUSES,
-        {
-            **relation_properties_params,
-            uid_param: convert_type_for_writing(related_node.uid),
-        },
+        f"SET new_relation = ${rows_param}_config, new_relation += relation.properties"
     )
 
 
-def build_write_query_and_params_dict(
-    node: AbstractBaseNode, username: str, extra_labels: list[str] | None = None, 
-) -> tuple[str, list[str], list[str], dict[str, Any]]:
-    
-    (
-        node_props,
-        params_dict,
-    ) = unpack_properties_to_create_props_and_param_dict(node, username=username)
+type RelationForWriting = tuple[str, str, dict[str, Any] | None, tuple[str, ...] | None]
 
-    node_identifier = get_unique_string()
+_relations_for_writing: dict[
+    type, tuple[dict[str, Any], dict[str, Any], tuple[RelationForWriting, ...]]
+] = {}
 
-    CREATE_CLAUSES = [
-        f"CREATE ({node_identifier}{labels_to_query_labels(node, extra_labels=extra_labels)} {node_props})"
-    ]
-    MATCH_CLAUSES = []
 
-    for embedded_name, embedded_definition in node.embedded_nodes.items():
-        for embedded_node in getattr(node, embedded_name):
-            (
-                embedded_node_identifier,
-                embedded_query_match_clauses,
-                embedded_query_create_clauses,
-                embedded_params_dict,
-            ) = build_write_query_and_params_dict(
-                embedded_node, extra_labels=["Embedded", "DeleteDetach"], username=username
-            )
-            CREATE_CLAUSES += [
-                *embedded_query_create_clauses,
-                f"CREATE ({node_identifier})-[:{embedded_name.upper()}]->({embedded_node_identifier})",
-            ]
-            MATCH_CLAUSES += embedded_query_match_clauses
-
-            params_dict = {**params_dict, **embedded_params_dict}
-
-    for relation_name, relation in node.outgoing_relations.items():
-        # print(">>>>", relation.target_base_class)
-        if inspect.isclass(relation.target_base_class) and issubclass(
-            relation.target_base_class, ReifiedRelation
-        ):
-            for related_reification in getattr(node, relation_name):
-                (
-                    reified_node_identifier,
-                    reified_query_match_clauses,
-                    reified_query_create_clauses,
-                    reified_params_dict,
-                ) = build_write_query_and_params_dict(related_reification, username=username)
-
-                relation_dict = {
-                    "reverse_name": relation.relation_config.reverse_name,
-                    "relation_labels": relation.relation_config.relation_labels,
-                    # **dict(related_reification.relation_properties),
-                }
-
-                (
-                    relation_properties_cypher,
-                    relation_properties_params,
-                ) = unpack_dict_to_cypher_map_and_params(relation_dict)
-
-                CREATE_CLAUSES += [
-                    *reified_query_create_clauses,
-                    f"CREATE ({node_identifier})-[:{relation_name.upper()} {relation_properties_cypher}]->({reified_node_identifier})",
-                ]
-                MATCH_CLAUSES += reified_query_match_clauses
-                params_dict = {
-                    **params_dict,
-                    **reified_params_dict,
-                    **relation_properties_params,
-                }
-        elif relation.relation_config.create_inline:
-            for related_item in getattr(node, relation_name):
-                extra_labels = ["CreateInline", "ReadInline"]
-                if relation.relation_config.edit_inline:
-                    extra_labels.append("EditInline")
-                if relation.relation_config.delete_related_on_detach:
-                    extra_labels.append("DeleteDetach")
-                (
-                    related_node_identifier,
-                    query_match_clauses,
-                    query_create_clauses,
-                    query_params_dict,
-                ) = build_write_query_and_params_dict(
-                    related_item, extra_labels=extra_labels, username=username
+def get_relations_for_writing(
+    node: AbstractBaseNode,
+) -> tuple[RelationForWriting, ...]:
+    """Get the (cached) embedded nodes and outgoing relations of a type of node, as they
+    are written: `(field_name, relation_type, config_properties, extra_labels)`.
+
+    `extra_labels` is None for a relation to an existing node; otherwise, the related
+    items are nodes to create with these extra labels. As with the property names,
+    the definitions are stored alongside, so this is worked out again if a model
+    is initialised again"""
+    embedded_nodes = node.embedded_nodes
+    outgoing_relations = node.outgoing_relations
+    cached = _relations_for_writing.get(type(node))
+    if (
+        cached is None
+        or cached[0] is not embedded_nodes
+        or cached[1] is not outgoing_relations
+    ):
+        relations: list[RelationForWriting] = [
+            (embedded_name, embedded_name.upper(), None, EMBEDDED_EXTRA_LABELS)
+            for embedded_name in embedded_nodes
+        ]
+        for relation_name, relation in outgoing_relations.items():
+            if relation.target_is_reified:
+                relations.append(
+                    (
+                        relation_name,
+                        relation_name.upper(),
+                        get_relation_config_properties(relation.relation_config),
+                        (),
+                    )
+                )
+            elif relation.relation_config.create_inline:
+                relations.append(
+                    (
+                        relation_name,
+                        relation_name.upper(),
+                        None,
+                        INLINE_EXTRA_LABELS[
+                            (
+                                relation.relation_config.edit_inline,
+                                relation.relation_config.delete_related_on_detach,
+                            )
+                        ],
+                    )
+                )
+            else:
+                relations.append(
+                    (
+                        relation_name,
+                        relation_name.upper(),
+                        get_relation_config_properties(relation.relation_config),
+                        None,
+                    )
                 )
+        cached = (embedded_nodes, outgoing_relations, tuple(relations))
+        _relations_for_writing[type(node)] = cached
+    return cached[2]
 
-                CREATE_CLAUSES += [
-                    *query_create_clauses,
-                    f"CREATE ({node_identifier})-[:{relation_name.upper()}]->({related_node_identifier})",
-                ]
-                MATCH_CLAUSES += query_match_clauses
-                params_dict = {**params_dict, **query_params_dict}
 
-        else:
-            for related_item in getattr(node, relation_name):
-                relation_dict = {
-                    "reverse_name": relation.relation_config.reverse_name,
-                    "relation_labels": relation.relation_config.relation_labels,
-                    **dict(getattr(related_item, "relation_properties", {})),
-                }
+def collect_nodes_and_relations_for_writing(
+    node: AbstractBaseNode,
+    nodes: list[tuple[str, dict[str, Any]]],
+    new_relations: list[RelationRow[int]],
+    existing_relations: list[RelationRow[str]],
+    extra_labels: tuple[str, ...] = (),
+) -> int:
+    """Walks a node and the embedded, inline and reified nodes to be created with it.
+
+    Adds a `(query_labels, properties)` row to `nodes` for each node to create; a
+    `(relation_type, config_properties, start_node_index, end_node_index, properties)` row
+    to `new_relations` for each relation between these; and a `(relation_type,
+    config_properties, start_node_index, end_node_uid, properties)` row to
+    `existing_relations` for each relation to an existing node.
+
+    Returns the index of `node` in `nodes`"""
+
+    node_index = len(nodes)
+    nodes.append(
+        (
+            labels_to_query_labels(node, extra_labels=extra_labels),
+            build_properties_create_dict(node),
+        )
+    )
 
-                (
-                    related_node_match_clauses,
-                    related_node_create_clauses,
-                    related_node_params,
-                ) = build_write_query_for_related_node(
-                    current_node_identifier=node_identifier,
-                    related_node=related_item,
-                    relation_label=relation_name,
-                    relation_properties=relation_dict,
+    for (
+        field_name,
+        relation_type,
+        config_properties,
+        related_extra_labels,
+    ) in get_relations_for_writing(node):
+        if related_extra_labels is None:
+            for related_item in getattr(node, field_name):
+                existing_relations.append(
+                    (
+                        relation_type,
+                        config_properties,
+                        node_index,
+                        convert_type_for_writing(related_item.uid),
+                        {
+                            key: convert_type_for_writing(value)
+                            for key, value in dict(
+                                getattr(related_item, "relation_properties", {})
+                            ).items()
+                        },
+                    )
                 )
-                params_dict = {**params_dict, **related_node_params}
-                MATCH_CLAUSES += related_node_match_clauses
-                CREATE_CLAUSES += related_node_create_clauses
+        else:
+            for related_item in getattr(node, field_name):
+                related_node_index = collect_nodes_and_relations_for_writing(
+                    related_item,
+                    nodes,
+                    new_relations,
+                    existing_relations,
+                    extra_labels=related_extra_labels,
+                )
+                new_relations.append(
+                    (
+                        relation_type,
+                        config_properties,
+                        node_index,
+                        related_node_index,
+                        {},
+                    )
+                )
+
+    return node_index
+
+
+def build_write_query_and_params_dict(
+    node: AbstractBaseNode, username: str
+) -> tuple[str, list[str], list[str], dict[str, Any]]:
+    """Builds the clauses and params to create a node, along with its embedded, inline
+    and reified nodes, and its relations to existing nodes.
+
+    Rather than a CREATE clause (and parameters) per node and relation, nodes with the
+    same labels are created together by UNWINDing a list of their properties, and
+    relations likewise grouped by type. The query text thus depends only on the shape
+    of the data, not the number of items, so it is short and its plan can be reused"""
+    nodes: list[tuple[str, dict[str, Any]]] = []
+    new_relations: list[RelationRow[int]] = []
+    existing_relations: list[RelationRow[str]] = []
+    node_index = collect_nodes_and_relations_for_writing(
+        node, nodes, new_relations, existing_relations
+    )
+
+    params_dict: dict[str, Any] = {"username": username}
+    MATCH_CLAUSES = []
+    CREATE_CLAUSES = []
+
+    # If any of the related nodes does not exist, the query should not create anything
+    # (and return nothing), so check they can all be found first
+    if existing_relations:
+        params_dict["related_uids"] = list(
+            dict.fromkeys(end_uid for _, _, _, end_uid, _ in existing_relations)
+        )
+        MATCH_CLAUSES.append(
+            """CALL {
+            UNWIND $related_uids AS related_uid
+            MATCH (related_node:BaseNode {uid: related_uid})
+            RETURN count(related_node) AS related_count
+        }
+        WITH related_count WHERE related_count = size($related_uids)"""
+        )
+
+    # Group nodes by labels, and note the index of each node in the list of
+    # all nodes created (in this grouped order), so relations can refer to them
+    node_groups: dict[str, list[int]] = {}
+    for index, (query_labels, _) in enumerate(nodes):
+        node_groups.setdefault(query_labels, []).append(index)
+
+    # The time is taken once, and passed into each batch of nodes to set on them
+    CREATE_CLAUSES.append("WITH datetime() AS now")
+
+    created_node_indexes: dict[int, int] = {}
+    for group_number, (query_labels, indexes) in enumerate(node_groups.items()):
+        params_dict[f"nodes_{group_number}"] = [nodes[i][1] for i in indexes]
+        for index in indexes:
+            created_node_indexes[index] = len(created_node_indexes)
+        CREATE_CLAUSES.append(
+            f"""CALL {{
+            WITH now
+            UNWIND $nodes_{group_number} AS properties
+            CREATE (new_node{query_labels})
+            SET new_node = properties, new_node.created_when = now, new_node.modified_when = now, new_node.created_by = $username, new_node.modified_by = $username
+            RETURN collect(new_node) AS created_{group_number}
+        }}"""
+        )
+    CREATE_CLAUSES.append(
+        f"WITH {" + ".join(f"created_{i}" for i in range(len(node_groups)))} AS created"
+    )
+
+    # Relations are grouped by type and by config, so that the properties from the
+    # config (the same for every relation in the group) are a single parameter
+    relation_groups: dict[
+        tuple[str, int], tuple[dict[str, Any] | None, list[dict[str, Any]]]
+    ] = {}
+    for relation_type, config_properties, start_index, end_index, properties in (
+        new_relations
+    ):
+        relation_groups.setdefault(
+            (relation_type, id(config_properties)), (config_properties, [])
+        )[1].append(
+            {
+                "start_index": created_node_indexes[start_index],
+                "end_index": created_node_indexes[end_index],
+                "properties": properties,
+            }
+        )
+    for group_number, ((relation_type, _), (config_properties, rows)) in enumerate(
+        relation_groups.items()
+    ):
+        params_dict[f"relations_{group_number}"] = rows
+        CREATE_CLAUSES.append(
+            f"""CALL {{
+            WITH created
+            UNWIND $relations_{group_number} AS relation
+            WITH created[relation.start_index] AS start_node, created[relation.end_index] AS end_node, relation
+            CREATE (start_node)-[new_relation:{relation_type}]->(end_node)
+            {_relation_set_clause(params_dict, f"relations_{group_number}", config_properties)}
+        }}"""
+        )
+
+    existing_relation_groups: dict[
+        tuple[str, int], tuple[dict[str, Any] | None, list[dict[str, Any]]]
+    ] = {}
+    for relation_type, config_properties, start_index, end_uid, properties in (
+        existing_relations
+    ):
+        existing_relation_groups.setdefault(
+            (relation_type, id(config_properties)), (config_properties, [])
+        )[1].append(
+            {
+                "start_index": created_node_indexes[start_index],
+                "end_uid": end_uid,
+                "properties": properties,
+            }
+        )
+    for group_number, ((relation_type, _), (config_properties, rows)) in enumerate(
+        existing_relation_groups.items()
+    ):
+        params_dict[f"related_{group_number}"] = rows
+        CREATE_CLAUSES.append(
+            f"""CALL {{
+            WITH created
+            UNWIND $related_{group_number} AS relation
+            MATCH (end_node:BaseNode {{uid: relation.end_uid}})
+            WITH created[relation.start_index] AS start_node, end_node, relation
+            CREATE (start_node)-[new_relation:{relation_type}]->(end_node)
+            {_relation_set_clause(params_dict, f"related_{group_number}", config_properties)}
+        }}"""
+        )
 
-    # for embedded_node_name, embedded_node_definition in node.embedded_nodes.items():
-    #    for embedded_node in getattr(node, rel)
+    node_identifier = "created_node"
+    CREATE_CLAUSES.append(
+        f"WITH created[{created_node_indexes[node_index]}] AS {node_identifier}"
+    )
 
     return node_identifier, MATCH_CLAUSES, CREATE_CLAUSES, params_dict
 
 
-def read_query(cls: type[AbstractBaseNode]):
+_read_queries: dict[type, tuple[tuple[Any, Any, Any], str]] = {}
+
+
+def read_query(cls: type[AbstractBaseNode]) -> str:
+    """Get the (cached) query to read a node of a class.
+
+    The query depends only on the class's relations and embedded nodes. These are
+    replaced with new definitions when models are initialised, so the definitions
+    are stored alongside, and the query built again if they change"""
+    definitions = (cls.outgoing_relations, cls.embedded_nodes, cls.incoming_relations)
+    cached = _read_queries.get(cls)
+    if cached is None or any(
+        cached_definition is not definition
+        for cached_definition, definition in zip(cached[0], definitions)
+    ):
+        cached = (definitions, _build_read_query(cls))
+        _read_queries[cls] = cached
+    return cached[1]
+
+
+def _build_read_query(cls: type[AbstractBaseNode]) -> str:
     label = cls.__name__
+
+    # Inline and reified nodes can only be reached through the node's own outgoing
+    # relations (embedded nodes have neither label), so these paths are only matched
+    # when it has relations that could lead to them
+    has_reified = any(
+        relation.target_is_reified for relation in cls.outgoing_relations.values()
+    )
+
     query = f"""
         
         MATCH path_to_node = (node:{label} {{uid: $uid}})
@@ -281,15 +528,15 @@ def read_query(cls: type[AbstractBaseNode]):
         CALL {{
             WITH node, path_to_node
             {"""OPTIONAL MATCH path_to_direct_nodes = (node)-[]->(:BaseNode)""" if cls.outgoing_relations else ""}
-            OPTIONAL MATCH path_through_read_nodes = (node)-[]->(:ReadInline)((:ReadInline)-[]->(:ReadInline)){{0,}}(:ReadInline)-[]->{{0,}}(:BaseNode)
+            {"""OPTIONAL MATCH path_through_read_nodes = (node)-[]->(:ReadInline)((:ReadInline)-[]->(:ReadInline)){0,}(:ReadInline)-[]->{0,}(:BaseNode)""" if cls.outgoing_relations else ""}
             {"""OPTIONAL MATCH path_to_related_through_embedded = (node)-[]->(:Embedded)((:Embedded)-[]->(:Embedded)){ 0, }(:Embedded)-[]->{0,}(:BaseNode)""" if cls.embedded_nodes else ""}
-            OPTIONAL MATCH path_to_reified = (node)-[]->(:ReifiedRelation)-[]->(:BaseNode)
+            {"""OPTIONAL MATCH path_to_reified = (node)-[]->(:ReifiedRelation)-[]->(:BaseNode)""" if has_reified else ""}
             WITH apoc.coll.flatten([
                 {"collect(path_to_direct_nodes)," if cls.outgoing_relations else ""}
                 {"collect(path_to_related_through_embedded)," if cls.embedded_nodes else ""}
-                collect(path_through_read_nodes),
-                collect(path_to_node),
-                collect(path_to_reified)
+                {"collect(path_through_read_nodes)," if cls.outgoing_relations else ""}
+                collect(path_to_node)
+                {", collect(path_to_reified)" if has_reified else ""}
             ]) AS paths, node
             CALL apoc.convert.toTree(paths)
             YIELD value
@@ -355,12 +602,30 @@ def create_set_statement_for_properties(
     return set_query, set_params
 
 
+_properties_for_updating: dict[
+    type,
+    tuple[dict[str, Any], tuple[str, ...], typing.Callable[[Any], tuple[Any, ...]]],
+] = {}
+
+
 def build_properties_update_dict(node: EditNodeBase):
+    # The names of the node's fields that are properties, and a getter for their
+    # values, are cached for each type (as for `_get_properties_for_writing`), rather
+    # than converting the whole node to a dict and filtering it
     property_fields = node.property_fields
+    cached = _properties_for_updating.get(type(node))
+    if cached is None or cached[0] is not property_fields:
+        prop_names = tuple(
+            prop_name
+            for prop_name in type(node).model_fields
+            if prop_name in property_fields
+        )
+        cached = (property_fields, prop_names, _values_getter(prop_names))
+        _properties_for_updating[type(node)] = cached
+    _, prop_names, getter = cached
     properties = {
         prop_name: convert_type_for_writing(prop_value)
-        for prop_name, prop_value in dict(node).items()
-        if prop_name in property_fields
+        for prop_name, prop_value in zip(prop_names, getter(node))
     }
     properties["real_type"] = node.base_class.__name__
     return properties
@@ -374,7 +639,7 @@ def build_update_related_query(node, relation_name, start_node_identifier):
         ]
     }
     query = f"""
-    // {node.__class__.__name__, node.uid}
+    // {node.__class__.__name__}
     CALL {{ // Attach existing node if it is not attached
         WITH {start_node_identifier}
         UNWIND ${related_item_array_identifier} AS updated_related_item_uid
@@ -382,7 +647,7 @@ def build_update_related_query(node, relation_name, start_node_identifier):
             WHERE NOT ({start_node_identifier})-[:{relation_name.upper()}]->(node_to_relate)
             CREATE ({start_node_identifier})-[:{relation_name.upper()}]->(node_to_relate)
     }}
-    // {node.__class__.__name__, node.uid}
+    // {node.__class__.__name__}
     CALL {{ // If not in list but is related, delete relation
         WITH {start_node_identifier}
         MATCH ({start_node_identifier})-[existing_rel_to_delete:{relation_name.upper()}]->(currently_related_item)
@@ -404,7 +669,7 @@ def build_update_inline_query_and_params(
     if not accumulated_withs:
         accumulated_withs = set([start_node_identifier])
 
-    update_relations_query = ""
+    update_relations_query_parts: list[str] = []
 
     update_set_query = ""
     params = {}
@@ -415,7 +680,34 @@ def build_update_inline_query_and_params(
     related_nodes_uid_list_param = get_unique_string()
     params.update({related_nodes_uid_list_param: related_node_uid_list})
 
+    extra_labels = INLINE_EXTRA_LABELS[
+        (
+            True,
+            node.outgoing_relations[relation_name].relation_config.delete_related_on_detach,
+        )
+    ]
+
+    # Related nodes with no embedded nodes or relations of their own only need to be
+    # merged and have their properties set, so those with the same labels are done
+    # together by UNWINDing a list of them, rather than with a MERGE clause each
+    unnested_related_node_rows: dict[str, list[dict[str, Any]]] = {}
+
     for related_node in related_nodes:
+        query_labels = labels_to_query_labels(related_node, extra_labels=extra_labels)
+
+        if (
+            not related_node.base_class.embedded_nodes
+            and not related_node.base_class.outgoing_relations
+        ):
+            unnested_related_node_rows.setdefault(query_labels, []).append(
+                {
+                    "uid": str(related_node.uid),
+                    "real_type": related_node.real_type,
+                    "properties": build_properties_update_dict(related_node),
+                }
+            )
+            continue
+
         related_node_identifier = get_unique_string()
         related_node_uid_param = get_unique_string()
         related_node_real_type_param = get_unique_string()
@@ -438,20 +730,15 @@ def build_update_inline_query_and_params(
             accumulated_withs=set([*accumulated_withs, related_node_identifier]),
         )
         accumulated_withs.add(related_node_identifier)
-
-        extra_labels = ["CreateInline", "ReadInline", "EditInline"]
-        if node.outgoing_relations[
-            relation_name
-        ].relation_config.delete_related_on_detach:
-            extra_labels.append("DeleteDetach")
-        query_labels = labels_to_query_labels(related_node, extra_labels=extra_labels)
+        # Joined once, for both WITH clauses after this node
+        with_identifiers = ", ".join(sorted(accumulated_withs))
 
         # update_relations_query +=
-        update_relations_query += f"""\n
+        update_relations_query_parts.append(f"""\n
         
         
         
-        MERGE ({related_node_identifier}{query_labels} {{uid: ${related_node_uid_param}, real_type: ${related_node_real_type_param}}}) // {related_node.base_class.__name__}, {related_node.uid}, {related_node.label}
+        MERGE ({related_node_identifier}{query_labels} {{uid: ${related_node_uid_param}, real_type: ${related_node_real_type_param}}}) // {related_node.base_class.__name__}
         ON CREATE
        
             {target_update_set_query}
@@ -459,7 +746,7 @@ def build_update_inline_query_and_params(
         ON MATCH
             {target_update_set_query}
         
-        WITH {", ".join(accumulated_withs)} // <<
+        WITH {with_identifiers} // <<
           {target_update_relations_query}
         
         
@@ -467,17 +754,31 @@ def build_update_inline_query_and_params(
         MERGE ({start_node_identifier})-[:{relation_name.upper()}]->({related_node_identifier})
         
 
-      WITH {", ".join(accumulated_withs)} // <<<<
-        """
+      WITH {with_identifiers} // <<<<
+        """)
 
         # update_relations_query += target_update_relations_query
 
         # update_set_query += target_update_set_query
         params.update(target_params)
-    update_relations_query += f"""
-    WITH {", ".join(accumulated_withs)} // <<<<
+
+    for query_labels, rows in unnested_related_node_rows.items():
+        rows_param = get_unique_string()
+        params[rows_param] = rows
+        params["username"] = username
+        update_relations_query_parts.append(f"""
+    CALL {{ // Merge related nodes with the same labels
+        WITH {start_node_identifier}
+        UNWIND ${rows_param} AS row
+        MERGE (related_node{query_labels} {{uid: row.uid, real_type: row.real_type}})
+        SET related_node = apoc.map.merge(row.properties, {{created_when: coalesce(related_node.created_when, datetime()), modified_when: datetime(), modified_by: $username}})
+        MERGE ({start_node_identifier})-[:{relation_name.upper()}]->(related_node)
+    }}""")
+
+    update_relations_query_parts.append(f"""
+    WITH {", ".join(sorted(accumulated_withs))} // <<<<
         
-    CALL {{ // cleanup from {node.label}
+    CALL {{ // cleanup from {node.__class__.__name__}
        WITH {start_node_identifier}
        MATCH ({start_node_identifier})-[existing_rel_to_delete:{relation_name.upper()}]->(currently_related_item)
        
@@ -493,9 +794,9 @@ def build_update_inline_query_and_params(
            
         }""" if delete_node_on_detach else ""}
 
-    }}"""
+    }}""")
 
-    return update_relations_query, update_set_query, params
+    return "".join(update_relations_query_parts), update_set_query, params
 
 
 def build_update_embedded_query_and_params(
@@ -506,11 +807,10 @@ def build_update_embedded_query_and_params(
     username: str,
     accumulated_withs=None,
 ):
-    print("Building embedded update query for", node.__class__.__name__)
     if not accumulated_withs:
         accumulated_withs = set([start_node_identifier])
 
-    update_relations_query = ""
+    update_relations_query_parts: list[str] = []
 
     update_set_query = ""
     params = {}
@@ -525,7 +825,6 @@ def build_update_embedded_query_and_params(
         embedded_node_identifier = get_unique_string()
         embedded_node_uid_param = get_unique_string()
         embedded_node_real_type_param = get_unique_string()
-        print("Adding embedded for", embedded_node.__class__.__name__)
         params.update(
             {
                 embedded_node_uid_param: str(embedded_node.uid),
@@ -544,30 +843,32 @@ def build_update_embedded_query_and_params(
             username=username
         )
         accumulated_withs.add(embedded_node_identifier)
+        # Joined once, for both WITH clauses after this node
+        with_identifiers = ", ".join(sorted(accumulated_withs))
 
-        extra_labels = ["Embedded", "DeleteDetach"]
-
-        query_labels = labels_to_query_labels(embedded_node, extra_labels=extra_labels)
+        query_labels = labels_to_query_labels(
+            embedded_node, extra_labels=EMBEDDED_EXTRA_LABELS
+        )
 
         # update_relations_query +=
-        update_relations_query += f"""\n
-        MERGE ({embedded_node_identifier}{query_labels} {{uid: ${embedded_node_uid_param}, real_type: ${embedded_node_real_type_param}}}) // {embedded_node.base_class.__name__}, {embedded_node.uid}
+        update_relations_query_parts.append(f"""\n
+        MERGE ({embedded_node_identifier}{query_labels} {{uid: ${embedded_node_uid_param}, real_type: ${embedded_node_real_type_param}}}) // {embedded_node.base_class.__name__}
         ON CREATE
             {target_update_set_query}
         ON MATCH
             {target_update_set_query}
-        WITH {", ".join(accumulated_withs)} // <<
+        WITH {with_identifiers} // <<
           {target_update_relations_query}
         MERGE ({start_node_identifier})-[:{embedded_relation_name.upper()}]->({embedded_node_identifier})
-      WITH {", ".join(accumulated_withs)} // <<<<
-        """
+      WITH {with_identifiers} // <<<<
+        """)
 
         # update_relations_query += target_update_relations_query
 
         # update_set_query += target_update_set_query
         params.update(target_params)
-    update_relations_query += f"""
-    WITH {", ".join(accumulated_withs)} // <<<<
+    update_relations_query_parts.append(f"""
+    WITH {", ".join(sorted(accumulated_withs))} // <<<<
         
     CALL  {{
        WITH {start_node_identifier}
@@ -585,9 +886,9 @@ def build_update_embedded_query_and_params(
            
         }}
         
-    }}"""
+    }}""")
 
-    return update_relations_query, update_set_query, params
+    return "".join(update_relations_query_parts), update_set_query, params
 
 
 def build_node_update_query_and_params(
@@ -600,10 +901,12 @@ def build_node_update_query_and_params(
     properties_dict_param = get_unique_string()
     params: dict[str, Any] = {properties_dict_param: properties_dict}
     params["username"] = username
-    update_set_query = f"""
-    SET {node_identifier} = apoc.map.merge(${properties_dict_param}, {{created_when: coalesce({node_identifier}.created_when, datetime()), modified_when: datetime(), modified_by: $username}}) // {properties_dict}
+    update_set_query_parts = [
+        f"""
+    SET {node_identifier} = apoc.map.merge(${properties_dict_param}, {{created_when: coalesce({node_identifier}.created_when, datetime()), modified_when: datetime(), modified_by: $username}})
     """
-    update_relations_query = ""
+    ]
+    update_relations_query_parts: list[str] = []
     for embedded_name, embedded_definition in node.base_class.embedded_nodes.items():
         (
             embedded_update_related_query,
@@ -612,8 +915,8 @@ def build_node_update_query_and_params(
         ) = build_update_embedded_query_and_params(
             node, embedded_name, node_identifier, username=username, accumulated_withs=accumulated_withs, 
         )
-        update_relations_query += embedded_update_related_query
-        update_set_query += embedded_update_set_query
+        update_relations_query_parts.append(embedded_update_related_query)
+        update_set_query_parts.append(embedded_update_set_query)
         params.update(embedded_params)
 
     for relation_name, relation in node.base_class.outgoing_relations.items():
@@ -621,7 +924,7 @@ def build_node_update_query_and_params(
             update_related_query, update_related_params = build_update_related_query(
                 node, relation_name, node_identifier
             )
-            update_relations_query += update_related_query
+            update_relations_query_parts.append(update_related_query)
             params.update(update_related_params)
         if relation.relation_config.edit_inline:
             (
@@ -638,30 +941,38 @@ def build_node_update_query_and_params(
                 
                 accumulated_withs=accumulated_withs,
             )
-            update_relations_query += relation_update_related_query
-            update_set_query += relation_update_set_query
+            update_relations_query_parts.append(relation_update_related_query)
+            update_set_query_parts.append(relation_update_set_query)
             params.update(relation_params)
 
-    return update_relations_query, update_set_query, params
+    return (
+        "".join(update_relations_query_parts),
+        "".join(update_set_query_parts),
+        params,
+    )
 
 
 def update_query(node: EditNodeBase, username:str) -> tuple[str, dict[str, Any]]:
+    start_query_identifiers()
     node_identifier = get_unique_string()
     node_uid_param = get_unique_string()
 
     params = {node_uid_param: str(node.uid)}
-    query = f"""MATCH ({node_identifier} {{uid: ${node_uid_param}}}) // {node.base_class.__name__}, {node.uid}, {node.label}"""
 
     (
         update_relations_query,
         update_set_query,
         node_update_params,
     ) = build_node_update_query_and_params(node, node_identifier, username=username)
-    query += update_relations_query
-
-    query += update_set_query
 
-    query += f"""RETURN {node_identifier}{{.uid}}"""
+    query = "".join(
+        [
+            f"""MATCH ({node_identifier} {{uid: ${node_uid_param}}}) // {node.base_class.__name__}""",
+            update_relations_query,
+            update_set_query,
+            f"""RETURN {node_identifier}{{.uid}}""",
+        ]
+    )
 
     params.update(node_update_params)
     return query, params
@@ -44,6 +44,12 @@ def initialise_database_driver(SETTINGS):
         SETTINGS.DB_URL,
         auth=(SETTINGS.DB_USER, SETTINGS.DB_PASSWORD),
         keep_alive=True,
+        max_connection_pool_size=SETTINGS.DB_MAX_CONNECTION_POOL_SIZE,
+        connection_acquisition_timeout=SETTINGS.DB_CONNECTION_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=SETTINGS.DB_MAX_CONNECTION_LIFETIME,
+        # Connections idle for longer than this are checked before being reused,
+        # so a dropped connection is replaced rather than failing a query
+        liveness_check_timeout=SETTINGS.DB_LIVENESS_CHECK_TIMEOUT,
     )
 
 
@@ -110,9 +116,7 @@ class Database:
     ) -> neo4j.Record | None:
         result = await tx.run("MATCH (n {uid: $uid}) RETURN n", uid=str(uid))
         item = await result.single()
-        summary = await result.consume()
-        print(item)
-        print(summary)
+        await result.consume()
         return item
 
     @classmethod
@@ -125,6 +129,19 @@ class Database:
         records = await result.values()
         return records
 
+    @classmethod
+    @write_transaction
+    async def cypher_write_many(
+        cls, tx: Transaction, cypher_queries: list[str], params: dict = {}
+    ) -> None:
+        """Run a number of queries one after another in a single transaction"""
+        for cypher_query in cypher_queries:
+            result = await tx.run(
+                cypher_query,  # type: ignore
+                **params,
+            )
+            await result.consume()
+
     @write_transaction
     async def write(self, tx: Transaction):
         result = await tx.run(
@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import typing
 
 from rich import print
@@ -35,24 +36,24 @@ class OmitFromNodeFullTextIndex(IndexAnnotation):
     pass
 
 
-def get_string_fields(model: type["BaseNode"]) -> list[str]:
+@functools.cache
+def get_string_fields(model: type["BaseNode"]) -> tuple[str, ...]:
+    """Names of the string fields of a model (which are indexed for full-text search),
+    worked out once per model"""
     string_fields = []
     for field_name, field in model.model_fields.items():
-
-        try:
-            annotated_type, *annotations = typing.get_args(field.annotation)
-            annotated_string = annotated_type == str and not any(
-                isinstance(ann, OmitFromNodeFullTextIndex)
-                or ann is OmitFromNodeFullTextIndex
-                for ann in annotations
-            )
-        except ValueError:
-            pass
-
-        if field.annotation == str or annotated_string:
+        # Pydantic moves the metadata of an Annotated type to field.metadata
+        annotated_type, *annotations = typing.get_args(field.annotation) or (
+            field.annotation,
+        )
+        if annotated_type == str and not any(
+            isinstance(ann, OmitFromNodeFullTextIndex)
+            or ann is OmitFromNodeFullTextIndex
+            for ann in [*annotations, *field.metadata]
+        ):
             string_fields.append(field_name)
 
-    return string_fields
+    return tuple(string_fields)
 
 
 def create_index_queries():
@@ -94,14 +95,16 @@ def install_indexes_and_constraints():
     queries = create_index_queries()
 
     async def _run(queries):
-
-        async def _run_query(query):
-            try:
-                await Database.cypher_write(query, {})
-            except Exception as e:
-                print(e)
-                
-
-        await asyncio.gather(*[_run_query(query) for query in queries])
+        # Schema changes are all made in one transaction, rather than a transaction
+        # (and round trip) for each. If that fails, they are run again one by one,
+        # so that one failing query does not stop the others being applied
+        try:
+            await Database.cypher_write_many(queries, {})
+        except Exception:
+            for query in queries:
+                try:
+                    await Database.cypher_write(query, {})
+                except Exception as e:
+                    print(e)
 
     asyncio.run(_run(queries))
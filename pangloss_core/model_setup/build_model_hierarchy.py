@@ -14,11 +14,15 @@ def build_model_hierarchy(model: type["BaseNode"]):
 
 
 def recursive_get_subclasses(model: type["BaseNode"]):
-
+    # Walked with a stack, adding to one list, rather than building a list at each
+    # level to be copied into the one above. Children are pushed in reverse so that
+    # the order is the same (each subclass followed by its own subclasses)
     subclasses = []
-    for subclass in model.__subclasses__():
+    stack = model.__subclasses__()[::-1]
+    while stack:
+        subclass = stack.pop()
         subclasses.append(subclass)
-        subclasses += recursive_get_subclasses(subclass)
+        stack.extend(reversed(subclass.__subclasses__()))
 
     return subclasses
 
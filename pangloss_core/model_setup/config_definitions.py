@@ -1,4 +1,5 @@
 import dataclasses
+import sys
 import types
 import typing
 
@@ -16,7 +17,7 @@ if typing.TYPE_CHECKING:
     from relation_properties_model import RelationPropertiesModel
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True)
 class RelationConfig:
     """Provides configuration for a `RelationTo` type, e.g.:
 
@@ -34,8 +35,31 @@ class RelationConfig:
     edit_inline: bool = False
     delete_related_on_detach: bool = False
 
+    def __post_init__(self):
+        _intern_relation_names(self)
 
-@dataclasses.dataclass
+
+def _intern_relation_names(
+    relation_config: "RelationConfig | _RelationConfigInstantiated",
+) -> None:
+    """Intern the relation names of a relation config, as the same few names
+    are shared by many relation definitions and used as keys during model setup"""
+    object.__setattr__(
+        relation_config, "reverse_name", sys.intern(relation_config.reverse_name)
+    )
+    if relation_config.subclasses_relation is not None:
+        object.__setattr__(
+            relation_config,
+            "subclasses_relation",
+            sys.intern(relation_config.subclasses_relation),
+        )
+
+
+# Unlike the relation definitions, this keeps its generated __repr__, which the
+# definitions' hashes are built from. It is not frozen, as labels are added to it
+# during setup, so (as a dataclass with eq) it stays unhashable. Otherwise
+# typing.Annotated's cache could hand back a type holding another, equal config
+@dataclasses.dataclass(slots=True)
 class _RelationConfigInstantiated:
     """Internal version of RelationConfig for storing the config on
     relationship declaration. Avoids exposing the `relation_to_base` variable
@@ -48,13 +72,49 @@ class _RelationConfigInstantiated:
     relation_model: typing.Optional[type["RelationPropertiesModel"]] = None
     validators: typing.Optional[typing.Sequence[annotated_types.BaseMetadata]] = None
     subclasses_relation: typing.Optional[str] = None
-    relation_labels: set[str] = dataclasses.field(default_factory=set)
+    # Most relations have no extra labels, so these share an empty frozenset
+    # (rather than each having its own set); a new frozenset is made when
+    # labels are added
+    relation_labels: frozenset[str] = frozenset()
     create_inline: bool = False
     edit_inline: bool = False
     delete_related_on_detach: bool = False
 
+    def __post_init__(self):
+        _intern_relation_names(self)
+
+    def add_relation_labels(self, labels: typing.Iterable[str]) -> None:
+        self.relation_labels = self.relation_labels.union(labels)
+
+
+# relation_to imports this module, so ReifiedRelation is imported on first use
+# (and then kept here), rather than at module level
+_reified_relation_class: type["ReifiedRelation"] | None = None
+
+
+def _is_reified_relation(target_base_class: typing.Any) -> bool:
+    global _reified_relation_class
+    if _reified_relation_class is None:
+        from pangloss_core.model_setup.relation_to import ReifiedRelation
+
+        _reified_relation_class = ReifiedRelation
+
+    return isinstance(target_base_class, type) and issubclass(
+        target_base_class, _reified_relation_class
+    )
+
 
-@dataclasses.dataclass
+def _outgoing_definition_post_init(
+    self: "_OutgoingRelationDefinition | _OutgoingReifiedRelationDefinition",
+) -> None:
+    object.__setattr__(
+        self, "target_is_reified", _is_reified_relation(self.target_base_class)
+    )
+
+
+# The outgoing (and embedded) definitions are made once per field during model
+# setup, and are never compared by value, so compare and hash by identity
+@dataclasses.dataclass(frozen=True, slots=True, repr=False, eq=False)
 class _OutgoingRelationDefinition:
     """Class containing the definition of an outgoing node:
 
@@ -62,49 +122,45 @@ class _OutgoingRelationDefinition:
     - `target_reference_class: type[BaseNodeReference]`: the reference class of the target class
     - `relation_config: _PG_RelationshipConfigInstantiated`: the configuration model for the relationship
     - `origin_base_class: type[BaseNode]`: the origin ("from") class of the relationship
+
+    Also sets `target_is_reified`: whether the target is a reification (checked once here,
+    rather than each time the relation is written)
     """
 
     target_base_class: type["AbstractBaseNode"]
     target_reference_class: type["BaseNodeReference"]
     relation_config: _RelationConfigInstantiated
     origin_base_class: type["AbstractBaseNode"]
+    target_is_reified: bool = dataclasses.field(init=False, repr=False, compare=False)
 
-    def __hash__(self):
-        return hash(
-            repr(self.origin_base_class)
-            + repr(self.target_base_class)
-            + repr(self.relation_config)
-        )
+    __post_init__ = _outgoing_definition_post_init
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True, repr=False, eq=False)
 class _OutgoingReifiedRelationDefinition:
     """Class containing the definition of an outgoing node:
 
     - `target_base_class: type[BaseNode]`: the target ("to") class of the relationship
-    - `target_reference_class: type[BaseNodeReference]`: the reference class of the target class
     - `relation_config: _PG_RelationshipConfigInstantiated`: the configuration model for the relationship
     - `origin_base_class: type[BaseNode]`: the origin ("from") class of the relationship
+
+    Also sets `target_is_reified`, as for `_OutgoingRelationDefinition`
     """
 
     target_base_class: type["AbstractBaseNode"]
     relation_config: _RelationConfigInstantiated
     origin_base_class: type["AbstractBaseNode"]
+    target_is_reified: bool = dataclasses.field(init=False, repr=False, compare=False)
 
-    def __hash__(self):
-        return hash(
-            repr(self.origin_base_class)
-            + repr(self.target_base_class)
-            + repr(self.relation_config)
-        )
+    __post_init__ = _outgoing_definition_post_init
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True)
 class EmbeddedConfig:
     validators: typing.Optional[typing.Sequence[annotated_types.BaseMetadata]] = None
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True)
 class _EmbeddedConfigInstantiated:
     embedded_node_base: (
         type["AbstractBaseNode"]
@@ -115,7 +171,7 @@ class _EmbeddedConfigInstantiated:
     validators: typing.Optional[typing.Sequence[annotated_types.BaseMetadata]] = None
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True, eq=False)
 class _EmbeddedNodeDefinition:
     embedded_class: (
         type["AbstractBaseNode"]
@@ -126,23 +182,35 @@ class _EmbeddedNodeDefinition:
     embedded_config: _EmbeddedConfigInstantiated
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, slots=True, repr=False)
 class _IncomingRelationDefinition:
     origin_base_class: type["AbstractBaseNode"]
     origin_reference_class: type["BaseNodeReference"]
     relation_config: _RelationConfigInstantiated
     target_base_class: type["AbstractBaseNode"]
+    _hash: int = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Incoming relations are only added once the outgoing relation configs are
+        # complete, so the hash can be worked out straight away
+        object.__setattr__(
+            self,
+            "_hash",
+            hash(
+                (
+                    "incoming_relation_definition",
+                    self.origin_base_class,
+                    self.origin_reference_class,
+                    repr(self.relation_config),
+                )
+            ),
+        )
 
     def __hash__(self):
-        return hash(
-            "incoming_relation_definition"
-            + repr(self.origin_base_class)
-            + repr(self.origin_reference_class)
-            + repr(self.relation_config)
-        )
+        return self._hash
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True, slots=True, repr=False)
 class _IncomingReifiedRelationDefinition:
     origin_base_class: type["AbstractBaseNode"]
     origin_reference_class: type["BaseNodeReference"]
@@ -150,13 +218,24 @@ class _IncomingReifiedRelationDefinition:
     relation_to_target_config: _RelationConfigInstantiated
     reification_class: type["ReifiedRelation"]
     target_base_class: type["AbstractBaseNode"]
+    _hash: int = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # As for _IncomingRelationDefinition
+        object.__setattr__(
+            self,
+            "_hash",
+            hash(
+                (
+                    "incoming_reified_relation_definition",
+                    self.origin_base_class,
+                    repr(self.relation_to_reification_config),
+                    repr(self.relation_to_target_config),
+                    self.reification_class,
+                    self.target_base_class,
+                )
+            ),
+        )
 
     def __hash__(self):
-        return hash(
-            "incoming_reified_relation_definition"
-            + repr(self.origin_base_class)
-            + repr(self.relation_to_reification_config)
-            + repr(self.relation_to_target_config)
-            + repr(self.reification_class)
-            + repr(self.target_base_class)
-        )
+        return self._hash
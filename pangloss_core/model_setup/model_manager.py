@@ -55,7 +55,8 @@ class ModelManager:
             subclass.outgoing_relations = {}
             __setup_update_relation_annotations__(subclass)
             __setup_update_reified_relation_annotations__(subclass)
-            subclass.model_rebuild(force=True, _parent_namespace_depth=depth)
+            # Not rebuilt here, as __setup_delete_subclassed_relations__ rebuilds the
+            # model when it is done (and nothing is built from it in between)
             __setup_delete_subclassed_relations__(subclass)
             subclass.embedded_nodes = {}
             __setup_update_embedded_definitions__(subclass)
@@ -69,15 +70,16 @@ class ModelManager:
             __setup_add_all_property_fields__(subclass)
 
         for subclass in cls._registered_models:
+            # Rebuilt once, below: anything built from the model in between is an
+            # Edit type, and these are all rebuilt again at the end
             __setup_construct_view_type__(subclass)
-            subclass.model_rebuild(force=True, _parent_namespace_depth=depth)
             __setup_construct_edit_type__(subclass)
 
             __setup_create_reference_class__(subclass)
             subclass.model_rebuild(force=True, _parent_namespace_depth=depth)
 
+        # Every Edit type is rebuilt, as property fields are added to each one after
+        # it is created. (It is not otherwise built more than once: related Edit types
+        # are reused once made, and cyclic ones are referred to by name)
         for subclass in cls._registered_models:
-            for k, v in subclass.Edit.model_fields.items():
-                v = v.rebuild_annotation()
-
             subclass.Edit.model_rebuild(force=True, _parent_namespace_depth=depth)
@@ -1,6 +1,6 @@
 import dataclasses
 import datetime
-import inspect
+import functools
 import types
 import typing
 
@@ -41,16 +41,51 @@ from pangloss_core.model_setup.relation_to import (
 )
 
 
+# Embedded and View types have more fields added once they are created, and are then
+# rebuilt straight away, so there is no point building their schemas when they are
+# created. (model_rebuild ignores defer_build, so that rebuild still builds the schema)
+_DEFER_BUILD = {"defer_build": True}
+
+
+@functools.cache
+def _config_field_names(config_type: type) -> tuple[str, ...]:
+    return tuple(field.name for field in dataclasses.fields(config_type))
+
+
+def _config_fields(config: EmbeddedConfig | RelationConfig) -> dict[str, typing.Any]:
+    """Shallow copy of a config's fields, for building the instantiated version
+    (`dataclasses.asdict` would deep copy the validators each time)"""
+    return {
+        field_name: getattr(config, field_name)
+        for field_name in _config_field_names(type(config))
+    }
+
+
+def _separate_config[T](
+    annotations: typing.Iterable[typing.Any], config_type: type[T]
+) -> tuple[T | None, list[typing.Any]]:
+    """Separate the first instance of `config_type` from the other annotations
+    of a field, in one pass (any further instances are dropped)"""
+    config: T | None = None
+    remaining_annotations = []
+    for item in annotations:
+        if isinstance(item, config_type):
+            if config is None:
+                config = item
+        else:
+            remaining_annotations.append(item)
+    return config, remaining_annotations
+
+
 def _get_all_subclasses(
     cls, include_abstract: bool = False
 ) -> set[type[AbstractBaseNode]]:
-    subclasses = []
+    subclasses = set()
     for subclass in cls.__subclasses__():
         if not subclass.__abstract__ or include_abstract:
-            subclasses += [subclass, *_get_all_subclasses(subclass)]
-        else:
-            subclasses += _get_all_subclasses(subclass)
-    return set(subclasses)
+            subclasses.add(subclass)
+        subclasses.update(_get_all_subclasses(subclass))
+    return subclasses
 
 
 def __setup_model_instantiates_abstract_trait__(
@@ -76,10 +111,12 @@ def _get_concrete_node_classes(
     By default, does not include subclasses of types or abstract classes.
     """
 
-    concrete_node_classes = []
+    # Results of recursive calls are added straight into one set, rather than
+    # being copied into lists
+    concrete_node_classes = set()
     if unpacked_classes := typing.get_args(classes):
         for cl in unpacked_classes:
-            concrete_node_classes += list(
+            concrete_node_classes.update(
                 _get_concrete_node_classes(
                     cl,
                     include_subclasses=include_subclasses,
@@ -93,15 +130,16 @@ def _get_concrete_node_classes(
         classes  # type: ignore
     ):
         for cl in classes.__pg_real_types_with_trait__:
-            concrete_node_classes += list(_get_concrete_node_classes(cl))
+            concrete_node_classes.update(_get_concrete_node_classes(cl))
 
     else:  # Classes is a single class
         if include_subclasses:
-            subclasses = _get_all_subclasses(classes, include_abstract=include_abstract)
-            concrete_node_classes.extend(subclasses)
+            concrete_node_classes.update(
+                _get_all_subclasses(classes, include_abstract=include_abstract)
+            )
         if include_abstract or not classes.__abstract__:  # type: ignore
-            concrete_node_classes.append(classes)
-    return set(concrete_node_classes)
+            concrete_node_classes.add(classes)
+    return concrete_node_classes
 
 
 def __pg_create_embedded_class__(cls: type[AbstractBaseNode]) -> type[EmbeddedNodeBase]:
@@ -121,6 +159,7 @@ def __pg_create_embedded_class__(cls: type[AbstractBaseNode]) -> type[EmbeddedNo
     embedded_class = pydantic.create_model(
         f"{cls.__name__}Embedded",
         __base__=EmbeddedNodeBase,
+        __cls_kwargs__=_DEFER_BUILD,
         real_type=(typing.Literal[cls.__name__], cls.__name__),  # type: ignore
     )
     embedded_class.base_class = cls
@@ -136,12 +175,13 @@ def __setup_update_embedded_definitions__(cls: type[AbstractBaseNode]) -> None:
 
     for field_name, field in cls.model_fields.items():
         annotation = field.rebuild_annotation()
+        annotation_args = typing.get_args(annotation)
 
-        if typing.get_args(annotation) and (
-            getattr(typing.get_args(annotation)[0], "__name__", False) == "Embedded"
+        if annotation_args and (
+            getattr(annotation_args[0], "__name__", False) == "Embedded"
             or getattr(annotation, "__name__", False) == "Embedded"
         ):
-            embedded_wrapper, *other_annotations = typing.get_args(annotation)
+            embedded_wrapper, *other_annotations = annotation_args
 
             try:
                 # If the class we are looking at is a BaseNode itself,
@@ -169,21 +209,14 @@ def __setup_update_embedded_definitions__(cls: type[AbstractBaseNode]) -> None:
                 embedded_base_type,
             )
 
-            try:
-                embedded_config: EmbeddedConfig | None = [
-                    item
-                    for item in other_annotations
-                    if isinstance(item, EmbeddedConfig)
-                ][0]
-                other_annotations = [
-                    item
-                    for item in other_annotations
-                    if not isinstance(item, EmbeddedConfig)
-                ]
-            except IndexError:
-                # We don't need to have either embedded_config or other annotations
-                embedded_config: EmbeddedConfig | None = None
-                other_annotations = []
+            embedded_config, remaining_annotations = _separate_config(
+                other_annotations, EmbeddedConfig
+            )
+            # We don't need to have either embedded_config or other annotations
+            # (and other annotations are only kept along with an embedded_config)
+            other_annotations = (
+                remaining_annotations if embedded_config is not None else []
+            )
 
             annotation, updated_config = __pg_build_embedded_annotation_type__(
                 embedded_node_type=embedded_base_type,
@@ -225,13 +258,11 @@ def __pg_build_embedded_annotation_type__(
     embedded_node_config_instantiated: _EmbeddedConfigInstantiated = (
         _EmbeddedConfigInstantiated(
             embedded_node_base=embedded_node_type,
-            **dataclasses.asdict(embedded_node_config),
+            **_config_fields(embedded_node_config),
         )
     )
 
-    validators = (
-        embedded_node_config.validators if embedded_node_config.validators else []
-    )
+    validators = embedded_node_config.validators or ()
 
     embedded_node_embedded_types = []
     for concrete_embedded_type in _get_concrete_node_classes(
@@ -259,27 +290,19 @@ def __setup_update_relation_annotations__(cls: type["AbstractBaseNode"]):
         # Relation fields can be defined as either a typing.Annotated (including metadata)
 
         field.annotation = field.rebuild_annotation()
+        annotation_args = typing.get_args(field.annotation)
 
         if (
-            typing.get_args(field.annotation)
-            and getattr(typing.get_args(field.annotation)[0], "__name__", False)
-            == "RelationTo"
+            annotation_args
+            and getattr(annotation_args[0], "__name__", False) == "RelationTo"
         ):
-            relation_wrapper, *other_annotations = typing.get_args(field.annotation)
+            relation_wrapper, *other_annotations = annotation_args
             related_base_type: type["AbstractBaseNode"] = relation_wrapper.__args__[0]
 
-            try:
-                relation_config: RelationConfig = [
-                    item
-                    for item in other_annotations
-                    if isinstance(item, RelationConfig)
-                ][0]
-                other_annotations = [
-                    item
-                    for item in other_annotations
-                    if not isinstance(item, RelationConfig)
-                ]
-            except IndexError:
+            relation_config, other_annotations = _separate_config(
+                other_annotations, RelationConfig
+            )
+            if relation_config is None:
                 raise PanglossConfigError(
                     f"{cls.__name__}.{field_name} is missing a RelationConfig object)"
                 )
@@ -315,7 +338,7 @@ def __setup_build_expanded_relation_annotation_type__(
 ) -> tuple[typing.Any, _RelationConfigInstantiated]:
     """Expands an annotation to include subclasses/classes from AbstractTrait, etc."""
 
-    validators = relation_config.validators if relation_config.validators else []
+    validators = relation_config.validators or ()
 
     concrete_related_types = _get_concrete_node_classes(
         related_model, include_subclasses=True
@@ -324,7 +347,7 @@ def __setup_build_expanded_relation_annotation_type__(
     all_related_types = []
     instantiated_relation_config = _RelationConfigInstantiated(
         relation_to_base=related_model,
-        **dataclasses.asdict(relation_config),  # type: ignore
+        **_config_fields(relation_config),  # type: ignore
     )
     for concrete_related_type in concrete_related_types:
         if relation_config.create_inline:
@@ -369,6 +392,14 @@ def __setup_initialise_reference_class__(cls):
         )
 
 
+# Reference types with relation properties, by the arguments they were made from.
+# These only depend on the class (not its fields), so can be reused whenever the
+# same relation is set up again
+_references_with_relation_properties: dict[
+    tuple[type, str | None, str | None, type], type[BaseNodeReference]
+] = {}
+
+
 def __setup_create_reference_class__(
     cls: type[AbstractBaseNode],
     relation_name: str | None = None,
@@ -382,17 +413,21 @@ def __setup_create_reference_class__(
     if not relation_properties_model:
         return cls.Reference
     else:
-        reference_model_name = (
-            f"{origin_class_name}__{relation_name}__{cls.__name__}Reference"
-        )
+        cache_key = (cls, relation_name, origin_class_name, relation_properties_model)
+        new_reference_class = _references_with_relation_properties.get(cache_key)
+        if new_reference_class is None:
+            reference_model_name = (
+                f"{origin_class_name}__{relation_name}__{cls.__name__}Reference"
+            )
 
-        new_reference_class = pydantic.create_model(
-            reference_model_name,
-            __base__=BaseNodeReference,
-            base_class=(typing.ClassVar[type["AbstractBaseNode"]], cls),
-            real_type=(typing.Literal[cls.__name__], cls.__name__),  # type: ignore
-            relation_properties=(relation_properties_model, ...),
-        )
+            new_reference_class = pydantic.create_model(
+                reference_model_name,
+                __base__=BaseNodeReference,
+                base_class=(typing.ClassVar[type["AbstractBaseNode"]], cls),
+                real_type=(typing.Literal[cls.__name__], cls.__name__),  # type: ignore
+                relation_properties=(relation_properties_model, ...),
+            )
+            _references_with_relation_properties[cache_key] = new_reference_class
 
         return new_reference_class
 
@@ -402,10 +437,13 @@ def __setup_delete_indirect_non_heritable_mixin_fields__(
 ) -> None:
     trait_fields_to_delete = set()
     for trait in cls.__pg_get_non_heritable_mixins_as_indirect_ancestors__():
-        for field_name in cls.model_fields:
-            # AND AND... not in the parent class annotations that is *not* a trait...
-            if field_name in trait.__annotations__ and trait not in cls.__annotations__:
-                trait_fields_to_delete.add(field_name)
+        # AND AND... not in the parent class annotations that is *not* a trait...
+        if trait not in cls.__annotations__:
+            # The model's fields that the trait also annotates, by set intersection
+            # rather than checking each field in turn
+            trait_fields_to_delete.update(
+                trait.__annotations__.keys() & cls.model_fields.keys()
+            )
     for td in trait_fields_to_delete:
         del cls.model_fields[td]
 
@@ -431,44 +469,30 @@ def __setup_run_init_subclass_checks__(cls: type[AbstractBaseNode]):
 
 def __setup_update_reified_relation_annotations__(cls: type["AbstractBaseNode"]):
     for field_name, field in cls.model_fields.items():
+        annotation_args = typing.get_args(field.annotation)
         if (
-            typing.get_args(field.annotation)
-            and inspect.isclass(typing.get_args(field.annotation)[0])
-            and issubclass(typing.get_args(field.annotation)[0], ReifiedRelation)
+            annotation_args
+            and isinstance(annotation_args[0], type)
+            and issubclass(annotation_args[0], ReifiedRelation)
         ):
             field.annotation = field.rebuild_annotation()
 
             reification_class, *other_annotations = typing.get_args(field.annotation)
             reification_class: type[ReifiedRelation] = reification_class
-            relation_config = typing.get_args(field.annotation)[1]
-            try:
-                relation_config: RelationConfig = [
-                    item
-                    for item in other_annotations
-                    if isinstance(item, RelationConfig)
-                    and not isinstance(item, ReifiedTargetConfig)
-                ][0]
-
-            except IndexError:
+            # ReifiedTargetConfig is a subclass of RelationConfig, so is separated first
+            target_config, other_annotations = _separate_config(
+                other_annotations, ReifiedTargetConfig
+            )
+            relation_config, other_annotations = _separate_config(
+                other_annotations, RelationConfig
+            )
+            if relation_config is None:
                 raise PanglossConfigError(
                     f"{cls.__name__}.{field_name} is missing a RelationConfig object)"
                 )
-
-            try:
-                target_config = [
-                    item
-                    for item in other_annotations
-                    if isinstance(item, ReifiedTargetConfig)
-                ][0]
-            except IndexError:
+            if target_config is None:
                 target_config = ReifiedTargetConfig(reverse_name="is_target_of")
 
-            other_annotations = [
-                item
-                for item in other_annotations
-                if not isinstance(item, (RelationConfig, ReifiedTargetConfig))
-            ]
-
             target_class: type["AbstractBaseNode"] = typing.cast(
                 type["AbstractBaseNode"],
                 reification_class.model_fields["target"].annotation,
@@ -536,7 +560,7 @@ def __setup_update_reified_relation_annotations__(cls: type["AbstractBaseNode"])
             #    new_reification_model.model_rebuild(force=True)
 
             updated_config = _RelationConfigInstantiated(
-                **dataclasses.asdict(relation_config),
+                **_config_fields(relation_config),
                 relation_to_base=new_reification_model,
             )
 
@@ -565,19 +589,26 @@ def __setup_recurse_embeddded_nodes_for_outgoing_types__(
             embedded_node_definition.embedded_class
         )
         for embedded_class in embedded_classes:
+            # The relations from further embedded nodes are found once for each
+            # embedded class (not again for each of its relations)
+            nested_relations: dict[str, _OutgoingRelationDefinition] | None = None
             for (
                 relation_name,
                 relation_definition,
             ) in embedded_class.outgoing_relations.items():
                 relations[relation_name] = relation_definition
-                for (
-                    rel_name,
-                    rel,
-                ) in __setup_recurse_embeddded_nodes_for_outgoing_types__(
-                    embedded_class
-                ).items():
-                    if not getattr(rel.origin_base_class, "is_embedded_type", False):
-                        relations[rel_name] = rel
+                if nested_relations is None:
+                    nested_relations = {
+                        rel_name: rel
+                        for (
+                            rel_name,
+                            rel,
+                        ) in __setup_recurse_embeddded_nodes_for_outgoing_types__(
+                            embedded_class
+                        ).items()
+                        if not getattr(rel.origin_base_class, "is_embedded_type", False)
+                    }
+                relations.update(nested_relations)
     return relations
 
 
@@ -592,29 +623,31 @@ def __setup_add_incoming_relations_to_related_models__(cls: type[AbstractBaseNod
         **cls.outgoing_relations,
         **__setup_recurse_embeddded_nodes_for_outgoing_types__(cls),
     }.items():
-        if inspect.isclass(relation_definition.target_base_class) and issubclass(
-            relation_definition.target_base_class, ReifiedRelation
-        ):
-            target_relation_config = [
+        if relation_definition.target_is_reified:
+            # Stop at the first config, rather than filtering the whole annotation
+            target_relation_config = next(
                 item
                 for item in typing.get_args(
                     relation_definition.target_base_class.__annotations__["target"]
                 )
                 if isinstance(item, _RelationConfigInstantiated)
-            ][0]
+            )
 
             target_base = target_relation_config.relation_to_base
 
+            # The reference class does not depend on the target, so is got once
+            origin_reference_class = __setup_create_reference_class__(
+                cls,
+                relation_properties_model=relation_definition.relation_config.relation_model,
+            )
+
             for target_base_class in _get_concrete_node_classes(target_base):
                 target_base_class.incoming_relations[
                     relation_definition.relation_config.reverse_name
                 ].add(
                     _IncomingReifiedRelationDefinition(
                         origin_base_class=cls,
-                        origin_reference_class=__setup_create_reference_class__(
-                            cls,
-                            relation_properties_model=relation_definition.relation_config.relation_model,
-                        ),
+                        origin_reference_class=origin_reference_class,
                         target_base_class=target_base_class,
                         reification_class=typing.cast(
                             type[ReifiedRelation],
@@ -672,8 +705,8 @@ def __setup_delete_subclassed_relations__(cls: type[AbstractBaseNode]):
                 relation_definition.relation_config.subclasses_relation
             ]
             # cls.model_rebuild(force=True)
-            relation_definition.relation_config.relation_labels.add(
-                relation_definition.relation_config.subclasses_relation
+            relation_definition.relation_config.add_relation_labels(
+                [relation_definition.relation_config.subclasses_relation]
             )
 
         for cl in cls.mro():
@@ -689,7 +722,7 @@ def __setup_delete_subclassed_relations__(cls: type[AbstractBaseNode]):
                     #    relation_definition.relation_config.subclasses_relation
                     # ].relation_config.relation_labels
                     # print("extra label")
-                    relation_definition.relation_config.relation_labels.update(
+                    relation_definition.relation_config.add_relation_labels(
                         cl.outgoing_relations[
                             relation_definition.relation_config.subclasses_relation
                         ].relation_config.relation_labels
@@ -721,17 +754,19 @@ def __setup_construct_view_type__(cls: type[AbstractBaseNode]):
         incoming_relation_name,
         incoming_relation_definitions,
     ) in cls.incoming_relations.items():
-        incoming_related_types: list[type[BaseNodeReference]] = []
-        for incoming_relation in incoming_relation_definitions:
-            incoming_related_types.append(incoming_relation.origin_reference_class)
+        incoming_related_types: tuple[type[BaseNodeReference], ...] = tuple(
+            incoming_relation.origin_reference_class
+            for incoming_relation in incoming_relation_definitions
+        )
         incoming_model_fields[incoming_relation_name] = (
-            typing.Optional[list[typing.Union[*tuple(incoming_related_types)]]],  # type: ignore
+            typing.Optional[list[typing.Union[*incoming_related_types]]],  # type: ignore
             pydantic.Field(default=None, json_schema_extra={"incoming_relation": True}),
         )
 
     view_model = pydantic.create_model(
         f"{cls.__name__}View",
         __base__=ViewNodeBase,
+        __cls_kwargs__=_DEFER_BUILD,
         is_view_model=(
             typing.ClassVar[bool],
             True,
@@ -749,8 +784,16 @@ def __setup_construct_view_type__(cls: type[AbstractBaseNode]):
     cls.View = view_model  # type: ignore
 
 
-def __setup_find_cyclic_outgoing_references_for_edit__(cls: type[AbstractBaseNode]):
-    cyclic = set()
+def __setup_find_cyclic_outgoing_references_for_edit__(
+    cls: type[AbstractBaseNode],
+    found_for_types: dict[type[AbstractBaseNode], set] | None = None,
+):
+    # The cyclic references found for each type visited are kept in `found_for_types`
+    # (shared through the recursion), so that each type is only explored once. This also
+    # stops the recursion going round a cycle that does not pass through `cls`
+    if found_for_types is None:
+        found_for_types = {}
+    cyclic = found_for_types[cls] = set()
     for relation_name, relation in cls.outgoing_relations.items():
         if relation.relation_config.edit_inline:
             for concrete_related_type in _get_concrete_node_classes(
@@ -776,11 +819,16 @@ def __setup_find_cyclic_outgoing_references_for_edit__(cls: type[AbstractBaseNod
 
                             else:
                                 # print("recurse on", inner_concrete_related_type)
-                                cyclic.update(
-                                    __setup_find_cyclic_outgoing_references_for_edit__(
-                                        inner_concrete_related_type
+                                if inner_concrete_related_type in found_for_types:
+                                    cyclic.update(
+                                        found_for_types[inner_concrete_related_type]
+                                    )
+                                else:
+                                    cyclic.update(
+                                        __setup_find_cyclic_outgoing_references_for_edit__(
+                                            inner_concrete_related_type, found_for_types
+                                        )
                                     )
-                                )
 
     return cyclic
 
@@ -789,47 +837,42 @@ def __setup_construct_edit_type__(cls: type[AbstractBaseNode]):
     if getattr(cls, "Edit", False) and cls.Edit.__name__ == f"{cls.__name__}Edit":
         return cls.Edit
     outgoing_relation_new_defs = {}
+    # Found (once) when there is a relation to edit inline
+    cyclic_related_types: set | None = None
     for relation_name, relation in cls.outgoing_relations.items():
-        if relation.relation_config.edit_inline:
+        relation_config = relation.relation_config
+        if relation_config.edit_inline:
             all_related_types = set()
+            if cyclic_related_types is None:
+                cyclic_related_types = (
+                    __setup_find_cyclic_outgoing_references_for_edit__(cls)
+                )
 
             for concrete_related_type in _get_concrete_node_classes(
                 relation.target_base_class, include_subclasses=True
             ):
-                if (
-                    concrete_related_type
-                    in __setup_find_cyclic_outgoing_references_for_edit__(cls)
-                ):
+                if concrete_related_type in cyclic_related_types:
                     all_related_types.add(f"{concrete_related_type.__name__}Edit")
                 else:
                     m = __setup_construct_edit_type__(concrete_related_type)
 
                     all_related_types.add(m)
 
-            outgoing_relation_new_defs[relation_name] = (
-                typing.Annotated[
-                    list[typing.Union[*tuple(all_related_types)]],  # type: ignore
-                    relation.relation_config.validators,
-                    relation.relation_config,
-                ],
-                pydantic.Field(default_factory=list, discriminator=""),
-            )
-
         else:
             # print(typing.get_args(cls.model_fields[relation_name].annotation))
-            all_related_types = []
-            for ann in typing.get_args(cls.model_fields[relation_name].annotation):
-                all_related_types.append(ann)
-
-            all_related_types = tuple(all_related_types)
-            outgoing_relation_new_defs[relation_name] = (
-                typing.Annotated[
-                    list[typing.Union[*all_related_types]],  # type: ignore
-                    relation.relation_config.validators,
-                    relation.relation_config,
-                ],
-                pydantic.Field(default_factory=list, discriminator=""),
+            # (get_args already gives a tuple, so is used as it is)
+            all_related_types = typing.get_args(
+                cls.model_fields[relation_name].annotation
             )
+
+        outgoing_relation_new_defs[relation_name] = (
+            typing.Annotated[
+                list[typing.Union[*all_related_types]],  # type: ignore
+                relation_config.validators,
+                relation_config,
+            ],
+            pydantic.Field(default_factory=list, discriminator=""),
+        )
     embedded_new_defs = {}
 
     for embedded_name, embedded_definition in cls.embedded_nodes.items():
@@ -864,9 +907,6 @@ def __setup_construct_edit_type__(cls: type[AbstractBaseNode]):
     for property_name, property in cls.property_fields.items():
         edit_model.model_fields[property_name] = property  # type: ignore
 
-    for k, v in edit_model.model_fields.items():
-        v = v.rebuild_annotation()
-
     cls.Edit = edit_model
 
     return edit_model
@@ -1,3 +1,5 @@
+import asyncio
+import math
 import re
 import typing
 import uuid
@@ -27,6 +29,17 @@ from pangloss_core.model_setup.config_definitions import EmbeddedConfig, Relatio
 from pangloss_core.model_setup.relation_properties_model import RelationPropertiesModel
 
 
+# Set to True to write each generated query to a file in the working directory,
+# for debugging. Off by default, as this is blocking file I/O inside the request
+WRITE_DEBUG_QUERY_FILES = False
+
+
+def _write_debug_query_file(file_name: str, *contents: typing.Any) -> None:
+    if WRITE_DEBUG_QUERY_FILES:
+        with open(file_name, "w") as f:
+            f.write("".join(str(content) for content in contents))
+
+
 class BaseNode(AbstractBaseNode):
     __abstract__ = True
 
@@ -42,8 +55,7 @@ class BaseNode(AbstractBaseNode):
     async def get_view(cls, tx: Transaction, uid: uuid.UUID) -> ViewNodeBase | None:
         query = cypher.read_query(cls)
 
-        with open("read_query.cypher", "w") as f:
-            f.write(query)
+        _write_debug_query_file("read_query.cypher", query)
 
         result = await tx.run(query, {"uid": str(uid)})  # type: ignore
         record = await result.value()
@@ -77,10 +89,7 @@ class BaseNode(AbstractBaseNode):
         return {node_identifier}{{.uid, .label, .real_type}}
         """
 
-        with open("write_query.cypher", "w") as f:
-            f.write(query)
-
-            f.write(str(params_dict))
+        _write_debug_query_file("write_query.cypher", query, params_dict)
 
         # try:
         # Annoyingly, need override this type hint as Transaction.run takes type LiteralString
@@ -107,8 +116,7 @@ class BaseNode(AbstractBaseNode):
         # path unpacking business at all!
         query = cypher.read_query(cls)
 
-        with open("read_query.cypher", "w") as f:
-            f.write(query)
+        _write_debug_query_file("read_query.cypher", query)
 
         result = await tx.run(query, {"uid": str(uid)})  # type: ignore
         record = await result.value()
@@ -124,10 +132,7 @@ class BaseNode(AbstractBaseNode):
         item: EditNodeBase, tx: Transaction, username: str = "Auto"
     ) -> None:
         query, params = cypher.update_query(item, username=username)
-        with open("update_query.cypher", "w") as f:
-            f.write(query)
-            f.write("\n\n\n\n")
-            f.write(str(params))
+        _write_debug_query_file("update_query.cypher", query, "\n\n\n\n", params)
         result = await tx.run(query, params)  # type: ignore
         record = await result.value()
         if len(record) == 0:
@@ -135,61 +140,77 @@ class BaseNode(AbstractBaseNode):
                 f'<{item.base_class.__name__} uid="{item.uid}"> not found'
             )
 
+    @staticmethod
+    def _list_search_string(q: str) -> str:
+        terms = q.split(" ")
+        return " AND ".join(f"/{re.escape(term)}.*/" for term in terms)
+
     @classmethod
     @read_transaction
-    async def get_list(
+    async def get_list_items(
         cls,
         tx: Transaction,
         q: typing.Optional[str],
         page: int = 0,
         page_size: int = 10,
-    ) -> list[BaseNodeReference]:
+    ) -> list[dict[str, typing.Any]]:
         if q:
-            terms = q.split(" ")
-
-            search_string = " AND ".join(f"/{re.escape(term)}.*/" for term in terms)
-
-            query = f"""            
-                CALL {{
-                    CALL db.index.fulltext.queryNodes("{cls.__name__}FullTextIndex", $q) YIELD node, score
-
-                    WITH collect(node) AS ns, COUNT(DISTINCT node) as total, score
-                    UNWIND ns AS m
-
-                    RETURN m as matches, total as total_items ORDER BY score SKIP $skip LIMIT $pageSize
-                }}
-                WITH COLLECT(matches{{.uid, .label, .citation, .real_type}}) AS matches_list, total_items
-                RETURN {{results: matches_list, count: total_items, page: $page, totalPages: toInteger(round((total_items*1.0)/$pageSize, 0, "UP"))}}
+            query = f"""
+                CALL db.index.fulltext.queryNodes("{cls.__name__}FullTextIndex", $q) YIELD node, score
+                RETURN node{{.uid, .label, .citation, .real_type}} AS match ORDER BY score SKIP $skip LIMIT $pageSize
             """
-
             params = {
                 "skip": (page - 1) * page_size,
                 "pageSize": page_size,
-                "page": page,
-                "q": search_string,
+                "q": cls._list_search_string(q),
             }
 
         else:
-            query = f"""CALL {{
-                        MATCH (node:{cls.__name__})
-                        WITH collect(node) AS ns, COUNT (DISTINCT node) as total
-                        UNWIND ns AS m
-                        RETURN m as matches, total as total_items ORDER BY m.label SKIP $skip LIMIT $pageSize
-                    }}
-                    WITH COLLECT(matches{{.uid, .label, .citation, .real_type}}) AS matches_list, total_items
-                    RETURN {{results: matches_list, count: total_items, page: $page, totalPages: toInteger(round((total_items*1.0)/$pageSize, 0, "UP"))}}
-                """
+            query = f"""
+                MATCH (node:{cls.__name__})
+                RETURN node{{.uid, .label, .citation, .real_type}} AS match ORDER BY node.label SKIP $skip LIMIT $pageSize
+            """
             params = {
                 "skip": (page - 1) * page_size,
                 "pageSize": page_size,
-                "page": page,
             }
 
         result = await tx.run(query, params)  # type: ignore
-        records = await result.value()
+        return await result.value()
 
-        try:
+    @classmethod
+    @read_transaction
+    async def get_list_count(cls, tx: Transaction, q: typing.Optional[str]) -> int:
+        if q:
+            query = f"""
+                CALL db.index.fulltext.queryNodes("{cls.__name__}FullTextIndex", $q) YIELD node
+                RETURN count(node)
+            """
+            params = {"q": cls._list_search_string(q)}
+        else:
+            query = f"""MATCH (node:{cls.__name__}) RETURN count(node)"""
+            params = {}
+
+        result = await tx.run(query, params)  # type: ignore
+        record = await result.single()
+        return record[0] if record else 0
 
-            return records[0]
-        except IndexError:
-            return {"results": [], "count": 0, "page": page, "totalPages": 0}
+    @classmethod
+    async def get_list(
+        cls,
+        q: typing.Optional[str],
+        page: int = 0,
+        page_size: int = 10,
+    ) -> dict[str, typing.Any]:
+        # Page of results and total count are separate queries (in separate sessions),
+        # so that they can run concurrently
+        results, count = await asyncio.gather(
+            cls.get_list_items(q=q, page=page, page_size=page_size),
+            cls.get_list_count(q=q),
+        )
+        return {
+            "results": results,
+            "count": count,
+            "page": page,
+            "totalPages": math.ceil(count / page_size),
+        }
@@ -0,0 +1,27 @@
+import typing
+
+import orjson
+import pydantic
+from fastapi.responses import JSONResponse
+
+
+def _default(obj: typing.Any) -> typing.Any:
+    """Fallback for types orjson does not serialise natively.
+
+    (orjson already handles `uuid.UUID` and `datetime` objects itself)"""
+    if isinstance(obj, pydantic.BaseModel):
+        return obj.model_dump(mode="json", by_alias=True)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, pydantic.AnyUrl):
+        return str(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson instead of the stdlib `json` module"""
+
+    media_type = "application/json"
+
+    def render(self, content: typing.Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -15,6 +15,18 @@ class BaseSettings(PydanticBaseSettings):
     DB_PASSWORD: str
     DB_DATABASE_NAME: str
 
+    # Connection pool of the Neo4j driver (see neo4j driver configuration docs)
+    DB_MAX_CONNECTION_POOL_SIZE: int = 100
+    DB_CONNECTION_ACQUISITION_TIMEOUT: float = 30.0
+    DB_MAX_CONNECTION_LIFETIME: float = 3600.0
+    DB_LIVENESS_CHECK_TIMEOUT: float | None = 30.0
+
+    # Seconds to cache each page of results from the list endpoints (0 to disable).
+    # The cache is per process and only cleared by creates/edits made through that
+    # process's API, so with several workers, or writes made outside the API, lists
+    # can be stale for up to this long
+    LIST_CACHE_TTL: float = 0
+
     INTERFACE_LANGUAGES: list[str]
     DEFAULT_INTERFACE_LANGUAGE: str = "en"
 
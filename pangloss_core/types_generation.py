@@ -1,7 +1,8 @@
 import os
 from pathlib import Path
+import collections.abc
 import typing
-import typing_inspect
+import types
 import inspect
 
 import annotated_types
@@ -11,6 +12,8 @@ from pangloss_core.exceptions import PanglossCLIError
 
 type_generation_cli = typer.Typer(name="types")
 
+_NON_GENERIC_ORIGINS = (tuple, typing.ClassVar, collections.abc.Callable)
+
 
 class Union(list):
     def __repr__(self):
@@ -24,24 +27,24 @@ class Literal(str):
 
 def parse(ann):
     """Parses a type annotation to a nested object"""
-    if typing_inspect.is_literal_type(ann):
-        return Literal(typing_inspect.get_args(ann)[0])
-    if typing.get_origin(ann) is typing.Annotated:
+    origin = typing.get_origin(ann)
+    args = typing.get_args(ann)
+    if origin is typing.Literal:
+        return Literal(args[0])
+    if origin is typing.Annotated:
         return {
-            **parse(typing_inspect.get_args(ann)[0]),
-            "type": typing.get_origin(typing_inspect.get_origin(ann))
-            or typing_inspect.get_origin(ann),
-            "annotations": list(typing.get_args(ann)[1:]),
+            **parse(args[0]),
+            "type": typing.get_origin(args[0]) or args[0],
+            "annotations": list(args[1:]),
         }
-    if typing_inspect.is_union_type(ann):
-        return Union(parse(a) for a in typing_inspect.get_args(ann))
+    if origin is typing.Union or origin is types.UnionType:
+        return Union(parse(a) for a in args)
 
-    if typing_inspect.is_generic_type(ann):
+    # Other parameterised generics (tuples, ClassVars and Callables are left whole)
+    if origin is not None and origin not in _NON_GENERIC_ORIGINS:
         return {
-            "type": typing_inspect.get_origin(ann)
-            or typing_inspect.get_origin(typing.get_args(ann)[0])
-            or typing_inspect.get_origin(ann),
-            "inner": parse(typing.get_args(ann)[0]),
+            "type": origin,
+            "inner": parse(args[0]),
         }
     return {"type": ann}
 
@@ -174,7 +174,13 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+async def get_current_user(
+    request: Request, token: Annotated[str, Depends(oauth2_scheme)]
+):
+    # FastAPI already caches a dependency within a request, but keep the resolved
+    # user on the request state so any other lookup in the same request reuses it
+    if (user := getattr(request.state, "current_user", None)) is not None:
+        return user
 
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -196,6 +202,7 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         raise credentials_exception
     if user is None:
         raise credentials_exception
+    request.state.current_user = user
     return user
 
 
@@ -2,13 +2,16 @@ import pytest
 import pytest_asyncio
 
 import asyncio
+import time
 import typing
 import uuid
 
+from fastapi import FastAPI
 from pydantic import AnyHttpUrl
 
 from pangloss_core.model_setup.model_manager import ModelManager
 from pangloss_core.settings import BaseSettings
+from pangloss_core.api import setup_api_routes
 from pangloss_core.application import get_application
 from pangloss_core.database import Database
 from pangloss_core.users import create_user, UserInDB
@@ -252,6 +255,21 @@ async def test_get_created_person(
     assert data["uid"] == person_created_response["uid"]
 
 
+@pytest.mark.asyncio
+async def test_get_edit_created_person(
+    logged_in_client: httpx.AsyncClient, person_created_response
+):
+    # "/edit" should not be matched by the "/{uid}" view route
+    response = await logged_in_client.get(
+        "/api/Person/edit", params={"uid": person_created_response["uid"]}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["label"] == "Toby Jones"
+    assert data["realType"] == "Person"
+    assert data["uid"] == person_created_response["uid"]
+
+
 @pytest.mark.asyncio
 async def test_create_factoid(
     logged_in_client: httpx.AsyncClient,
@@ -318,3 +336,70 @@ async def test_list_query(logged_in_client: httpx.AsyncClient, zotero_entry):
     data = response.json()
     assert data["count"] == 1
     assert uuid.UUID(data["results"][0]["uid"]) == zotero_entry.uid
+
+
+@pytest_asyncio.fixture
+async def logged_in_cached_list_client(logged_in_client: httpx.AsyncClient):
+    """Client for API routes set up with the list cache enabled"""
+    cached_list_application = setup_api_routes(
+        FastAPI(), settings.model_copy(update={"LIST_CACHE_TTL": 60})
+    )
+    async with httpx.AsyncClient(
+        app=cached_list_application,
+        base_url="http://test",
+        cookies=logged_in_client.cookies,
+        follow_redirects=True,
+    ) as async_client:
+        yield async_client
+
+
+@pytest.mark.asyncio
+async def test_create_with_api_clears_list_cache(
+    logged_in_cached_list_client: httpx.AsyncClient,
+):
+    response = await logged_in_cached_list_client.get("/api/Person/")
+    assert response.status_code == 200
+    assert response.json()["count"] == 0
+
+    response = await logged_in_cached_list_client.post(
+        "/api/Person/new",
+        json={
+            "label": "Toby Jones",
+            "realType": "Person",
+        },
+    )
+    assert response.status_code == 200
+    uid = response.json()["uid"]
+
+    # The list is cached for 60 seconds, but the create should clear it
+    response = await logged_in_cached_list_client.get("/api/Person/")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 1
+    assert data["results"][0]["uid"] == uid
+
+
+def test_list_cache():
+    from pangloss_core.api import _ListCache
+
+    cache = _ListCache(ttl=60, maxsize=2)
+    cache.set(("a",), {"count": 1})
+    cache.set(("b",), {"count": 2})
+    assert cache.get(("a",)) == {"count": 1}
+
+    # ("b",) is now the least recently used, so is evicted
+    cache.set(("c",), {"count": 3})
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == {"count": 1}
+
+    cache.clear()
+    assert cache.get(("a",)) is None
+
+    short_cache = _ListCache(ttl=0.01)
+    short_cache.set(("a",), {"count": 1})
+    time.sleep(0.02)
+    assert short_cache.get(("a",)) is None
+
+    disabled_cache = _ListCache(ttl=0)
+    disabled_cache.set(("a",), {"count": 1})
+    assert disabled_cache.get(("a",)) is None
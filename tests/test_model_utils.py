@@ -81,3 +81,38 @@ def test_get_concrete_node_classes_with_abstract():
         DatePrecise,
         DateImprecise,
     }
+
+
+def test_get_string_fields():
+    from pangloss_core.indexes import get_string_fields, OmitFromNodeFullTextIndex
+
+    class Thing(BaseNode):
+        name: str
+        age: int
+        nickname: typing.Optional[str]
+        secret: typing.Annotated[str, OmitFromNodeFullTextIndex]
+
+    assert get_string_fields(Thing) == ("label", "real_type", "name", "nickname")
+
+
+def test_equal_instantiated_relation_configs_are_not_shared():
+    from pangloss_core.model_setup.config_definitions import (
+        _RelationConfigInstantiated,
+    )
+
+    class Thing(BaseNode):
+        pass
+
+    config = _RelationConfigInstantiated(reverse_name="is_of", relation_to_base=Thing)
+    other_config = _RelationConfigInstantiated(
+        reverse_name="is_of", relation_to_base=Thing
+    )
+
+    # Equal configs must not be swapped for one another by typing's cache,
+    # as labels are added to each one separately
+    assert typing.get_args(typing.Annotated[list[Thing], other_config])[1] is not config
+    assert typing.get_args(typing.Annotated[list[Thing], config])[1] is config
+
+    config.add_relation_labels(["Label"])
+    assert config.relation_labels == {"Label"}
+    assert other_config.relation_labels == frozenset()